@@ -1,110 +1,42 @@
 """
 Deploys:
-- Network: VPC, Subnets, Security Groups
-- DB Backend: PostgreSQL RDS, Redis
+- Network: VPC, Subnets, Security Groups, Load Balancers
+- Data: PostgreSQL RDS, Redis
+- App: ECS Cluster, S3 Bucket, Lago services, Monitoring
+
+By default everything is deployed as a single stack. Setting `layer` to
+`network`, `data` or `app` deploys only that layer; the data and app layers
+then read the layers below them from the stacks named by `network_stack`
+and `data_stack` (fully qualified, e.g. `acme/lago-pulumi/prod-network`).
 """
 
 import pulumi
-import pulumi_random as random
-import network
-import database
-import cluster
-import frontend
-import backend
-import bucket
+import layers
 
 config = pulumi.Config()
-service_name = config.get("service_name") or "lago"
-lago_version = config.get("lago_version")
-db_name = config.get("db_name") or "lago"
-db_user = config.get("db_user") or "lago"
+layer = config.get("layer") or "all"
 
-db_password = config.get_secret("db_password")
-if not db_password:
-    password = random.RandomPassword(
-        "db_password",
-        length=16,
-    )
-    db_password = password.result
-
-# Create an AWS VPC with Subnets and Security Groups
-network = network.Vpc(f"{service_name}-net", network.VpcArgs())
-subnet_ids = []
-for subnet in network.subnets:
-    subnet_ids.append(subnet.id)
-
-# Create an RDS PostgreSQL instance
-db = database.Db(
-    f"{service_name}-db",
-    database.DbArgs(
-        db_name=db_name,
-        db_user=db_user,
-        db_password=db_password,
-        subnet_ids=subnet_ids,
-        security_group_ids=[network.rds_security_group.id],
-    ),
-)
+if layer == "all":
+    net = layers.network_layer(config)
+    data = layers.data_layer(config, net)
+    outputs = layers.app_layer(config, net, data)
 
-# Create a Elasticache Redis instance
-redis = database.Redis(
-    f"{service_name}-redis",
-    database.RedisArgs(
-        redis_name=db_name,
-        subnet_ids=subnet_ids,
-        security_group_ids=[network.redis_security_group.id],
-    ),
-)
+elif layer == "network":
+    outputs = layers.network_layer(config)
 
-# Create ECS Cluster
-cluster = cluster.Cluster(f"{service_name}-ecs")
+elif layer == "data":
+    net = layers.stack_outputs(config.require("network_stack"), layers.NETWORK_OUTPUTS)
+    outputs = layers.data_layer(config, net)
 
-bucket = bucket.Bucket(
-    f"keel-{service_name}-storage", bucket.BucketArgs(role_name=cluster.role.name)
-)
+elif layer == "app":
+    net = layers.stack_outputs(config.require("network_stack"), layers.NETWORK_OUTPUTS)
+    data = layers.stack_outputs(config.require("data_stack"), layers.DATA_OUTPUTS)
+    outputs = layers.app_layer(config, net, data)
 
-# Create Backend
-backend = backend.Backend(
-    f"{service_name}-be",
-    backend.BackendArgs(
-        cluster_arn=cluster.cluster.arn,
-        role=cluster.role,
-        lago_version=lago_version,
-        vpc_id=network.vpc.id,
-        subnet_ids=subnet_ids,
-        app_security_group=network.app_security_group,
-        container_security_group=network.be_security_group,
-        db_host=db.db.address,
-        db_name=db_name,
-        db_user=db_user,
-        db_password=db_password,
-        redis_host=redis.redis.cache_nodes[0].address,
-        bucket_name=bucket.bucket.bucket,
-        front_url=network.front_lb.dns_name,
-        api_url=network.back_lb.dns_name,
-        alb_arn=network.back_lb.arn,
-    ),
-)
-
-# Create Frontend
-front = frontend.Frontend(
-    f"{service_name}-front",
-    frontend.FrontendArgs(
-        cluster_arn=cluster.cluster.arn,
-        role=cluster.role,
-        lago_version=lago_version,
-        vpc_id=network.vpc.id,
-        subnet_ids=subnet_ids,
-        security_group_ids=[network.app_security_group.id],
-        api_url=network.back_lb.dns_name,
-        alb_arn=network.front_lb.arn,
-    ),
-)
-
-front_url = pulumi.Output.concat("http://", network.front_lb.dns_name)
-api_url = pulumi.Output.concat("http://", network.back_lb.dns_name)
+else:
+    raise ValueError(
+        f"Unsupported layer '{layer}', expected 'all', 'network', 'data' or 'app'"
+    )
 
-pulumi.export("Lago Front URL", front_url)
-pulumi.export("Lago API URL", api_url)
-pulumi.export("ECS Cluster Name", cluster.cluster.name)
-pulumi.export("Lago Version", lago_version)
-pulumi.export("Service Name", service_name)
+for key, value in outputs.items():
+    pulumi.export(key, value)
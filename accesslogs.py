@@ -0,0 +1,286 @@
+import json
+import lookups
+
+from pulumi import ComponentResource, Output, ResourceOptions
+from pulumi_aws import athena, config, glue, s3
+
+# Columns and regex of the ALB access log format, as documented by AWS
+ALB_LOG_COLUMNS = [
+    ("type", "string"),
+    ("time", "string"),
+    ("elb", "string"),
+    ("client_ip", "string"),
+    ("client_port", "int"),
+    ("target_ip", "string"),
+    ("target_port", "int"),
+    ("request_processing_time", "double"),
+    ("target_processing_time", "double"),
+    ("response_processing_time", "double"),
+    ("elb_status_code", "int"),
+    ("target_status_code", "string"),
+    ("received_bytes", "bigint"),
+    ("sent_bytes", "bigint"),
+    ("request_verb", "string"),
+    ("request_url", "string"),
+    ("request_proto", "string"),
+    ("user_agent", "string"),
+    ("ssl_cipher", "string"),
+    ("ssl_protocol", "string"),
+    ("target_group_arn", "string"),
+    ("trace_id", "string"),
+    ("domain_name", "string"),
+    ("chosen_cert_arn", "string"),
+    ("matched_rule_priority", "string"),
+    ("request_creation_time", "string"),
+    ("actions_executed", "string"),
+    ("redirect_url", "string"),
+    ("lambda_error_reason", "string"),
+    ("target_port_list", "string"),
+    ("target_status_code_list", "string"),
+    ("classification", "string"),
+    ("classification_reason", "string"),
+    ("conn_trace_id", "string"),
+]
+
+ALB_LOG_REGEX = (
+    r"([^ ]*) ([^ ]*) ([^ ]*) ([^ ]*):([0-9]*) ([^ ]*)[:-]([0-9]*) ([-.0-9]*) "
+    r"([-.0-9]*) ([-.0-9]*) (|[-0-9]*) (-|[-0-9]*) ([-0-9]*) ([-0-9]*) "
+    r'"([^ ]*) (.*) (- |[^ ]*)" "([^"]*)" ([A-Z0-9-_]+) ([A-Za-z0-9.-]*) ([^ ]*) '
+    r'"([^"]*)" "([^"]*)" "([^"]*)" ([-.0-9]*) ([^ ]*) "([^"]*)" "([^"]*)" '
+    r'"([^ ]*)" "([^\s]+?)" "([^\s]+)" "([^ ]*)" "([^ ]*)" ?([^ ]*)?'
+)
+
+# Saved Athena queries, formatted with the table name
+QUERIES = {
+    "path-latency-percentiles": (
+        "Per-path target latency percentiles over the last day",
+        """
+SELECT
+  alb,
+  request_verb,
+  regexp_replace(url_extract_path(request_url), '/[0-9a-f-]{{8,}}', '/:id') AS path,
+  count(*) AS requests,
+  approx_percentile(target_processing_time, 0.50) AS p50,
+  approx_percentile(target_processing_time, 0.95) AS p95,
+  approx_percentile(target_processing_time, 0.99) AS p99
+FROM {table}
+WHERE day >= date_format(current_date - interval '1' day, '%Y/%m/%d')
+  AND target_processing_time >= 0
+GROUP BY 1, 2, 3
+ORDER BY p99 DESC
+LIMIT 100
+""",
+    ),
+    "path-latency-hourly": (
+        "Hourly latency percentiles of one path over the last week, to compare upgrades",
+        """
+SELECT
+  date_trunc('hour', from_iso8601_timestamp(time)) AS hour,
+  count(*) AS requests,
+  approx_percentile(target_processing_time, 0.50) AS p50,
+  approx_percentile(target_processing_time, 0.95) AS p95,
+  approx_percentile(target_processing_time, 0.99) AS p99
+FROM {table}
+WHERE alb = 'api'
+  AND day >= date_format(current_date - interval '7' day, '%Y/%m/%d')
+  AND url_extract_path(request_url) = '/api/v1/events/batch'
+  AND target_processing_time >= 0
+GROUP BY 1
+ORDER BY 1
+""",
+    ),
+    "slow-targets": (
+        "Slow and failing requests broken down by target over the last day",
+        """
+SELECT
+  alb,
+  target_ip,
+  target_status_code,
+  count(*) AS requests,
+  count_if(target_processing_time > 1) AS slow_requests,
+  count_if(elb_status_code >= 500) AS errors_5xx,
+  approx_percentile(target_processing_time, 0.99) AS p99
+FROM {table}
+WHERE day >= date_format(current_date - interval '1' day, '%Y/%m/%d')
+GROUP BY 1, 2, 3
+ORDER BY slow_requests DESC
+LIMIT 100
+""",
+    ),
+}
+
+
+class AccessLogsArgs:
+
+    def __init__(
+        self,
+        database_name=None,
+        prefixes=["api", "front"],
+        expiration_days=30,
+        projection_start="2024/01/01",
+    ):
+        self.database_name = database_name
+        # One log prefix per load balancer, exposed as the `alb` partition
+        self.prefixes = prefixes
+        self.expiration_days = expiration_days
+        self.projection_start = projection_start
+
+
+class AccessLogs(ComponentResource):
+
+    def __init__(
+        self,
+        name: str,
+        args: AccessLogsArgs,
+        opts: ResourceOptions = None,
+    ):
+        super().__init__("custom:resource:AccessLogs", name, {}, opts)
+
+        # Create a dedicated S3 bucket for the load balancer access logs
+        self.bucket = s3.Bucket(
+            name,
+            acl="private",
+            lifecycle_rules=[
+                s3.BucketLifecycleRuleArgs(
+                    enabled=True,
+                    expiration=s3.BucketLifecycleRuleExpirationArgs(
+                        days=args.expiration_days,
+                    ),
+                ),
+                s3.BucketLifecycleRuleArgs(
+                    enabled=True,
+                    prefix="athena-results/",
+                    expiration=s3.BucketLifecycleRuleExpirationArgs(
+                        days=7,
+                    ),
+                ),
+            ],
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Allow Elastic Load Balancing to deliver logs to the bucket
+        elb_account = lookups.elb_service_account()
+        self.bucket_policy = s3.BucketPolicy(
+            f"{name}-policy",
+            bucket=self.bucket.id,
+            policy=Output.all(self.bucket.arn, elb_account.arn).apply(
+                lambda values: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Principal": {"AWS": values[1]},
+                                "Action": "s3:PutObject",
+                                "Resource": f"{values[0]}/*",
+                            },
+                            {
+                                "Effect": "Allow",
+                                "Principal": {
+                                    "Service": "logdelivery.elasticloadbalancing.amazonaws.com"
+                                },
+                                "Action": "s3:PutObject",
+                                "Resource": f"{values[0]}/*",
+                            },
+                        ],
+                    }
+                )
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Name of the bucket, resolving once log delivery is allowed, as load
+        # balancers validate the bucket when access logs are enabled
+        self.bucket_name = Output.all(self.bucket.bucket, self.bucket_policy.id).apply(
+            lambda values: values[0]
+        )
+
+        # Create a Glue table over the logs, partitioned by load balancer and
+        # day through partition projection so no crawler or MSCK is needed
+        self.database = glue.CatalogDatabase(
+            f"{name}-db",
+            name=args.database_name,
+            opts=ResourceOptions(parent=self),
+        )
+
+        account_id = lookups.caller_identity().account_id
+        location = Output.concat(
+            "s3://",
+            self.bucket.bucket,
+            "/${alb}/AWSLogs/",
+            account_id,
+            "/elasticloadbalancing/",
+            config.region,
+            "/${day}",
+        )
+
+        self.table = glue.CatalogTable(
+            f"{name}-table",
+            name="alb_logs",
+            database_name=self.database.name,
+            table_type="EXTERNAL_TABLE",
+            parameters={
+                "EXTERNAL": "TRUE",
+                "projection.enabled": "true",
+                "projection.alb.type": "enum",
+                "projection.alb.values": ",".join(args.prefixes),
+                "projection.day.type": "date",
+                "projection.day.range": f"{args.projection_start},NOW",
+                "projection.day.format": "yyyy/MM/dd",
+                "projection.day.interval": "1",
+                "projection.day.interval.unit": "DAYS",
+                "storage.location.template": location,
+            },
+            partition_keys=[
+                glue.CatalogTablePartitionKeyArgs(name="alb", type="string"),
+                glue.CatalogTablePartitionKeyArgs(name="day", type="string"),
+            ],
+            storage_descriptor=glue.CatalogTableStorageDescriptorArgs(
+                location=Output.concat("s3://", self.bucket.bucket, "/"),
+                input_format="org.apache.hadoop.mapred.TextInputFormat",
+                output_format="org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat",
+                ser_de_info=glue.CatalogTableStorageDescriptorSerDeInfoArgs(
+                    serialization_library="org.apache.hadoop.hive.serde2.RegexSerDe",
+                    parameters={
+                        "serialization.format": "1",
+                        "input.regex": ALB_LOG_REGEX,
+                    },
+                ),
+                columns=[
+                    glue.CatalogTableStorageDescriptorColumnArgs(name=column, type=kind)
+                    for column, kind in ALB_LOG_COLUMNS
+                ],
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Create an Athena workgroup and the saved latency queries
+        self.workgroup = athena.Workgroup(
+            f"{name}-wg",
+            name=name,
+            force_destroy=True,
+            configuration=athena.WorkgroupConfigurationArgs(
+                result_configuration=athena.WorkgroupConfigurationResultConfigurationArgs(
+                    output_location=Output.concat(
+                        "s3://", self.bucket.bucket, "/athena-results/"
+                    ),
+                ),
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        table_name = Output.concat(self.database.name, ".", self.table.name)
+        for query_name, (description, query) in QUERIES.items():
+            athena.NamedQuery(
+                f"{name}-{query_name}",
+                name=query_name,
+                description=description,
+                database=self.database.name,
+                workgroup=self.workgroup.id,
+                query=table_name.apply(
+                    lambda table, query=query: query.format(table=table).strip()
+                ),
+                opts=ResourceOptions(parent=self),
+            )
+
+        self.register_outputs({})
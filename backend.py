@@ -1,10 +1,48 @@
 import base64
-import json
+import bluegreen
+import logs
+import pulumi_command as command
 import pulumi_random as random
 import pulumi_tls as tls
+import tracing
 
 from pulumi import ComponentResource, Output, ResourceOptions
-from pulumi_aws import lb, ecs, cloudwatch, iam, config, get_caller_identity
+from pulumi_aws import lb, ecs, config
+
+# Runs the migration task to completion and fails on a non-zero exit code
+MIGRATE_SCRIPT = """
+set -e
+TASK_ARN=$(aws ecs run-task \\
+  --cluster "$CLUSTER" \\
+  --task-definition "$TASK_DEFINITION" \\
+  --launch-type FARGATE \\
+  --network-configuration "awsvpcConfiguration={subnets=[$SUBNETS],securityGroups=[$SECURITY_GROUP],assignPublicIp=ENABLED}" \\
+  --query 'tasks[0].taskArn' --output text)
+aws ecs wait tasks-stopped --cluster "$CLUSTER" --tasks "$TASK_ARN"
+EXIT_CODE=$(aws ecs describe-tasks --cluster "$CLUSTER" --tasks "$TASK_ARN" \\
+  --query "tasks[0].containers[?name=='$CONTAINER'].exitCode | [0]" --output text)
+echo "Migration task $TASK_ARN exited with $EXIT_CODE"
+test "$EXIT_CODE" = "0"
+"""
+
+# First Lago version whose image ships scripts/start.api.sh and
+# scripts/migrate.sh. Older images only have scripts/start.sh, which runs the
+# migrations itself before starting the API.
+SPLIT_ENTRYPOINTS_VERSION = (1, 2, 0)
+
+
+def has_split_entrypoints(lago_version):
+    """
+    Whether the API image of a Lago version can start without migrating.
+    Versions that do not parse, such as a branch name, are assumed recent.
+    """
+    try:
+        release = tuple(
+            int(part) for part in str(lago_version).split("-")[0].split(".")[:3]
+        )
+    except ValueError:
+        return True
+    return release >= SPLIT_ENTRYPOINTS_VERSION
 
 
 class BackendArgs:
@@ -29,6 +67,27 @@ class BackendArgs:
         front_url=None,
         alb_arn=None,
         api_url=None,
+        pdf_url=None,
+        log_retention_days=14,
+        log_max_buffer_size="25m",
+        log_router=None,
+        deregistration_delay=30,
+        health_check_grace_period_seconds=60,
+        deployment_minimum_healthy_percent=100,
+        deployment_maximum_percent=200,
+        deployment_controller="ECS",
+        traffic_shift="linear",
+        test_listener_port=8080,
+        api_desired_count=1,
+        api_command=None,
+        migrate_command=["./scripts/migrate.sh"],
+        run_migrations=None,
+        clock_command=["./scripts/start.clock.sh"],
+        clock_cpu="256",
+        clock_memory="512",
+        tracing_exporter=None,
+        tracing_endpoint=None,
+        tracing_sampling_ratio=0.1,
     ):
         self.lago_version = lago_version
         self.cluster_arn = cluster_arn
@@ -48,6 +107,30 @@ class BackendArgs:
         self.front_url = front_url
         self.alb_arn = alb_arn
         self.api_url = api_url
+        self.pdf_url = pdf_url
+        self.log_retention_days = log_retention_days
+        self.log_max_buffer_size = log_max_buffer_size
+        self.log_router = log_router
+        self.deregistration_delay = deregistration_delay
+        self.health_check_grace_period_seconds = health_check_grace_period_seconds
+        self.deployment_minimum_healthy_percent = deployment_minimum_healthy_percent
+        self.deployment_maximum_percent = deployment_maximum_percent
+        self.deployment_controller = deployment_controller
+        self.traffic_shift = traffic_shift
+        self.test_listener_port = test_listener_port
+        self.api_desired_count = api_desired_count
+        # api_command and run_migrations default to the split entrypoints
+        # when the image has them, and else to the image's own command,
+        # migrating on boot
+        self.api_command = api_command
+        self.run_migrations = run_migrations
+        self.migrate_command = migrate_command
+        self.clock_command = clock_command
+        self.clock_cpu = clock_cpu
+        self.clock_memory = clock_memory
+        self.tracing_exporter = tracing_exporter
+        self.tracing_endpoint = tracing_endpoint
+        self.tracing_sampling_ratio = tracing_sampling_ratio
 
 
 class Backend(ComponentResource):
@@ -68,13 +151,23 @@ class Backend(ComponentResource):
             opts=ResourceOptions(parent=self),
         )
 
+        blue_green = args.deployment_controller == "CODE_DEPLOY"
+
+        split_entrypoints = has_split_entrypoints(args.lago_version)
+        api_command = args.api_command
+        if api_command is None and split_entrypoints:
+            api_command = ["./scripts/start.api.sh"]
+        run_migrations = args.run_migrations
+        if run_migrations is None:
+            run_migrations = split_entrypoints
+
         # Create a Target Group for API
-        api_target_group = lb.TargetGroup(
-            f"{name}-api-tg",
+        api_target_group_args = dict(
             port=3000,
             protocol="HTTP",
             target_type="ip",
             vpc_id=args.vpc_id,
+            deregistration_delay=args.deregistration_delay,
             health_check=lb.TargetGroupHealthCheckArgs(
                 path="/health",
                 port=3000,
@@ -84,6 +177,10 @@ class Backend(ComponentResource):
                 protocol="HTTP",
                 matcher="200-399",
             ),
+        )
+        api_target_group = lb.TargetGroup(
+            f"{name}-api-tg",
+            **api_target_group_args,
             opts=ResourceOptions(parent=self),
         )
 
@@ -98,8 +195,33 @@ class Backend(ComponentResource):
                     target_group_arn=api_target_group.arn,
                 )
             ],
-            opts=ResourceOptions(parent=self),
+            opts=ResourceOptions(
+                parent=self, ignore_changes=["defaultActions"] if blue_green else None
+            ),
         )
+        api_listeners = [api_listener]
+
+        # Blue/green deployments shift traffic to a second Target Group, which
+        # is reachable through the test listener before the cutover
+        if blue_green:
+            api_green_target_group = lb.TargetGroup(
+                f"{name}-api-tg-green",
+                **api_target_group_args,
+                opts=ResourceOptions(parent=self),
+            )
+            api_test_listener = lb.Listener(
+                f"{name}-api-test-listener",
+                load_balancer_arn=args.alb_arn,
+                port=args.test_listener_port,
+                default_actions=[
+                    lb.ListenerDefaultActionArgs(
+                        type="forward",
+                        target_group_arn=api_target_group.arn,
+                    )
+                ],
+                opts=ResourceOptions(parent=self, ignore_changes=["defaultActions"]),
+            )
+            api_listeners.append(api_test_listener)
 
         database_url = Output.concat(
             "postgres://",
@@ -225,11 +347,11 @@ class Backend(ComponentResource):
             },
             {
                 "name": "AWS_REGION",
-                "value": "eu-west-2",
+                "value": config.region,
             },
             {
                 "name": "LAGO_AWS_S3_REGION",
-                "value": "eu-west-2",
+                "value": config.region,
             },
             {
                 "name": "LAGO_AWS_S3_BUCKET",
@@ -245,6 +367,31 @@ class Backend(ComponentResource):
             },
         ]
 
+        if args.pdf_url is not None:
+            environment.append(
+                {
+                    "name": "LAGO_PDF_URL",
+                    "value": args.pdf_url,
+                }
+            )
+
+        # Create the log group shared by the API task containers
+        task_logs = logs.TaskLogs(
+            f"{name}-task",
+            retention_in_days=args.log_retention_days,
+            max_buffer_size=args.log_max_buffer_size,
+            router=args.log_router,
+            bucket_name=args.bucket_name,
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Configure the optional OpenTelemetry collector sidecar
+        task_tracing = tracing.TaskTracing(
+            exporter=args.tracing_exporter,
+            endpoint=args.tracing_endpoint,
+            sampling_ratio=args.tracing_sampling_ratio,
+        )
+
         # Create the API ECS Task Definition
         api_task_name = f"{name}-api-task"
         api_container_name = f"{name}-api-container"
@@ -269,29 +416,94 @@ class Backend(ComponentResource):
                                 "protocol": "tcp",
                             }
                         ],
-                        "logConfiguration": {
-                            "logDriver": "awslogs",
-                            "options": {
-                                "awslogs-create-group": "true",
-                                "awslogs-group": f"/ecs/{name}-task",
-                                "awslogs-region": "eu-west-2",
-                                "awslogs-stream-prefix": "ecs",
-                            },
-                        },
-                        "environment": environment,
+                        **({"command": api_command} if api_command else {}),
+                        **task_logs.configuration(),
+                        "environment": environment
+                        + task_tracing.environment(f"{name}-api"),
                     }
                 ]
+                + task_logs.sidecars()
+                + task_tracing.sidecars(task_logs)
             ),
             opts=ResourceOptions(parent=self),
         )
 
+        self.migrate_task_definition = None
+        self.migration = None
+        if run_migrations:
+            # Create the one-off migration ECS Task Definition, so API tasks boot
+            # without running or waiting on schema migrations
+            migrate_task_name = f"{name}-migrate-task"
+            migrate_container_name = f"{name}-migrate-container"
+            self.migrate_task_definition = ecs.TaskDefinition(
+                migrate_task_name,
+                family=migrate_task_name,
+                cpu="512",
+                memory="1024",
+                network_mode="awsvpc",
+                requires_compatibilities=["FARGATE"],
+                execution_role_arn=args.role.arn,
+                task_role_arn=args.role.arn,
+                container_definitions=Output.json_dumps(
+                    [
+                        {
+                            "name": migrate_container_name,
+                            "image": f"getlago/api:v{args.lago_version}",
+                            "command": args.migrate_command,
+                            **task_logs.configuration("migrate"),
+                            "environment": environment,
+                        }
+                    ]
+                    + task_logs.sidecars()
+                ),
+                opts=ResourceOptions(parent=self),
+            )
+
+            # Run the migrations once per Lago version, before the services
+            # roll. A new migration task definition alone, e.g. for a logging
+            # change, must not re-run them: updates of the command are no-ops,
+            # and only its replacement on a new version runs the script.
+            self.migration = command.local.Command(
+                f"{name}-migrate",
+                create=MIGRATE_SCRIPT,
+                update="true",
+                environment={
+                    "AWS_REGION": config.region,
+                    "CLUSTER": args.cluster_arn,
+                    "TASK_DEFINITION": self.migrate_task_definition.arn,
+                    "CONTAINER": migrate_container_name,
+                    "SUBNETS": Output.from_input(args.subnet_ids).apply(
+                        lambda ids: ",".join(ids)
+                    ),
+                    "SECURITY_GROUP": args.container_security_group,
+                },
+                triggers=[args.lago_version],
+                opts=ResourceOptions(parent=self),
+            )
+
+        migration = [self.migration] if self.migration else []
+
         # Create the API ECS Service
         self.api_service = ecs.Service(
             f"{name}-api-svc",
             cluster=args.cluster_arn,
-            desired_count=1,
+            desired_count=args.api_desired_count,
             launch_type="FARGATE",
             task_definition=self.api_task_definition.arn,
+            health_check_grace_period_seconds=args.health_check_grace_period_seconds,
+            deployment_minimum_healthy_percent=args.deployment_minimum_healthy_percent,
+            deployment_maximum_percent=args.deployment_maximum_percent,
+            deployment_controller=ecs.ServiceDeploymentControllerArgs(
+                type=args.deployment_controller,
+            ),
+            deployment_circuit_breaker=(
+                None
+                if blue_green
+                else ecs.ServiceDeploymentCircuitBreakerArgs(
+                    enable=True,
+                    rollback=True,
+                )
+            ),
             network_configuration=ecs.ServiceNetworkConfigurationArgs(
                 assign_public_ip=True,
                 subnets=args.subnet_ids,
@@ -304,7 +516,87 @@ class Backend(ComponentResource):
                     container_port=3000,
                 )
             ],
-            opts=ResourceOptions(depends_on=[api_listener], parent=self),
+            opts=ResourceOptions(
+                depends_on=api_listeners + migration,
+                parent=self,
+                # CodeDeploy owns the running task definition and target group
+                ignore_changes=(
+                    ["taskDefinition", "loadBalancers"] if blue_green else None
+                ),
+            ),
+        )
+
+        # Create the CodeDeploy deployment group for blue/green rollouts
+        self.api_blue_green = None
+        self.api_app_spec = None
+        if blue_green:
+            self.api_blue_green = bluegreen.BlueGreen(
+                f"{name}-api-bg",
+                bluegreen.BlueGreenArgs(
+                    cluster_arn=args.cluster_arn,
+                    service_name=self.api_service.name,
+                    prod_listener_arn=api_listener.arn,
+                    test_listener_arn=api_test_listener.arn,
+                    blue_target_group_name=api_target_group.name,
+                    green_target_group_name=api_green_target_group.name,
+                    traffic_shift=args.traffic_shift,
+                ),
+                opts=ResourceOptions(parent=self),
+            )
+            self.api_app_spec = self.api_blue_green.app_spec(
+                self.api_task_definition.arn, api_container_name, 3000
+            )
+
+        # Create the clock ECS Task Definition, enqueuing Lago periodic jobs
+        clock_task_name = f"{name}-clock-task"
+        clock_container_name = f"{name}-clock-container"
+        self.clock_task_definition = ecs.TaskDefinition(
+            clock_task_name,
+            family=clock_task_name,
+            cpu=args.clock_cpu,
+            memory=args.clock_memory,
+            network_mode="awsvpc",
+            requires_compatibilities=["FARGATE"],
+            execution_role_arn=args.role.arn,
+            task_role_arn=args.role.arn,
+            container_definitions=Output.json_dumps(
+                [
+                    {
+                        "name": clock_container_name,
+                        "image": f"getlago/api:v{args.lago_version}",
+                        "command": args.clock_command,
+                        **task_logs.configuration("clock"),
+                        "environment": environment
+                        + task_tracing.environment(f"{name}-clock"),
+                    }
+                ]
+                + task_logs.sidecars()
+                + task_tracing.sidecars(task_logs)
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Create the clock ECS Service. It must run as a singleton: the old
+        # task is stopped before the new one starts, so periodic jobs are
+        # never enqueued twice during a deployment.
+        self.clock_service = ecs.Service(
+            f"{name}-clock-svc",
+            cluster=args.cluster_arn,
+            desired_count=1,
+            launch_type="FARGATE",
+            task_definition=self.clock_task_definition.arn,
+            deployment_minimum_healthy_percent=0,
+            deployment_maximum_percent=100,
+            deployment_circuit_breaker=ecs.ServiceDeploymentCircuitBreakerArgs(
+                enable=True,
+                rollback=True,
+            ),
+            network_configuration=ecs.ServiceNetworkConfigurationArgs(
+                assign_public_ip=True,
+                subnets=args.subnet_ids,
+                security_groups=[args.container_security_group],
+            ),
+            opts=ResourceOptions(depends_on=migration, parent=self),
         )
 
         self.register_outputs({})
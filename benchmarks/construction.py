@@ -0,0 +1,336 @@
+"""
+Benchmarks the construction of the resource graph under mocks: for each
+component, then for one stack and for N parameterised stacks built in the
+same process. Records the time, peak memory, and number of resources and
+Outputs registered, as JSON, so changes to them show up in review.
+
+    python benchmarks/construction.py --stacks 10 --output benchmarks/results/construction.json
+
+Commit the regenerated results with any change to the resource graph:
+tests/test_benchmarks.py fails when the committed resource and Output counts
+differ from a fresh run, and `--check` does the same without writing.
+"""
+
+import argparse
+import importlib.metadata
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pulumi  # noqa: E402
+from pulumi_aws import iam  # noqa: E402
+
+from benchmarks.mocks import run, run_program  # noqa: E402
+
+RESULTS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "results", "construction.json"
+)
+
+CLUSTER_ARN = "arn:aws:ecs:us-east-1:123456789012:cluster/lago"
+ALB_ARN = "arn:aws:elasticloadbalancing:us-east-1:123456789012:loadbalancer/app/lago"
+ZONES = ["us-east-1a", "us-east-1b", "us-east-1c"]
+
+
+def task_role():
+    return iam.Role("task-role", assume_role_policy="{}")
+
+
+def build_vpc():
+    import network
+
+    network.Vpc("net", network.VpcArgs(availability_zones=ZONES))
+
+
+def build_db():
+    import database
+
+    database.Db(
+        "db",
+        database.DbArgs(
+            db_name="lago",
+            db_user="lago",
+            db_password="secret",
+            subnet_ids=["subnet-a", "subnet-b"],
+            security_group_ids=["sg-rds"],
+        ),
+    )
+
+
+def build_redis():
+    import database
+
+    database.Redis(
+        "redis",
+        database.RedisArgs(
+            redis_name="lago",
+            subnet_ids=["subnet-a", "subnet-b"],
+            security_group_ids=["sg-redis"],
+        ),
+    )
+
+
+def build_cluster():
+    import cluster
+
+    cluster.Cluster("ecs")
+
+
+def build_bucket():
+    import bucket
+
+    bucket.Bucket("storage", bucket.BucketArgs(role_name="task-role"))
+
+
+def build_backend():
+    import backend
+
+    backend.Backend(
+        "be",
+        backend.BackendArgs(
+            lago_version="1.20.0",
+            cluster_arn=CLUSTER_ARN,
+            role=task_role(),
+            vpc_id="vpc-1",
+            subnet_ids=["subnet-a", "subnet-b"],
+            app_security_group="sg-app",
+            container_security_group="sg-be",
+            db_host="db.internal",
+            db_name="lago",
+            db_user="lago",
+            db_password="secret",
+            redis_host="redis.internal",
+            bucket_name="storage",
+            front_url="front.example.com",
+            api_url="api.example.com",
+            alb_arn=ALB_ARN,
+        ),
+    )
+
+
+def build_frontend():
+    import frontend
+
+    frontend.Frontend(
+        "front",
+        frontend.FrontendArgs(
+            lago_version="1.20.0",
+            cluster_arn=CLUSTER_ARN,
+            role=task_role(),
+            vpc_id="vpc-1",
+            subnet_ids=["subnet-a", "subnet-b"],
+            security_group_ids=["sg-app"],
+            api_url="api.example.com",
+            alb_arn=ALB_ARN,
+        ),
+    )
+
+
+COMPONENTS = {
+    "Vpc": build_vpc,
+    "Db": build_db,
+    "Redis": build_redis,
+    "Cluster": build_cluster,
+    "Bucket": build_bucket,
+    "Backend": build_backend,
+    "Frontend": build_frontend,
+}
+
+
+def stack_config(index):
+    """
+    Config of the index-th parameterised stack, varying the options that
+    change the shape of the graph.
+    """
+    config = {
+        "service_name": f"lago{index}",
+        "availability_zones": json.dumps(ZONES),
+        "deployment_controller": "CODE_DEPLOY" if index % 2 else "ECS",
+        "access_logs": str(index % 4 == 3).lower(),
+    }
+    if index % 3 == 1:
+        config["tracing_exporter"] = "xray"
+    return config
+
+
+class OutputCounter:
+    """
+    Counts the Outputs created while active.
+    """
+
+    def __enter__(self):
+        self.count = 0
+        self.original_init = pulumi.Output.__init__
+        counter = self
+
+        def init(output, *args, **kwargs):
+            counter.count += 1
+            counter.original_init(output, *args, **kwargs)
+
+        pulumi.Output.__init__ = init
+        return self
+
+    def __exit__(self, *exc_info):
+        pulumi.Output.__init__ = self.original_init
+
+
+def measure(construct):
+    """
+    Runs construct() once for time, then once under tracemalloc and Output
+    counting, as both slow construction down.
+    """
+    program_run = construct()
+
+    tracemalloc.start()
+    with OutputCounter() as outputs:
+        construct()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "resources": len(program_run.resources),
+        "outputs": outputs.count,
+        "construction_ms": program_run.construction_seconds * 1000,
+        "total_ms": program_run.total_seconds * 1000,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def summarize(measurements):
+    """
+    Medians of repeated measurements, rounded for stable diffs.
+    """
+    summary = {}
+    for metric in measurements[0]:
+        values = [measurement[metric] for measurement in measurements]
+        if isinstance(values[0], int):
+            summary[metric] = statistics.median_low(values)
+        else:
+            summary[metric] = round(statistics.median(values), 1)
+    return summary
+
+
+def benchmark(stacks=10, repeat=5):
+    # Warm the imports up, so the first measurement is not an outlier
+    run_program(stack_config(0))
+
+    results = {
+        "python": platform.python_version(),
+        "pulumi": importlib.metadata.version("pulumi"),
+        "pulumi_aws": importlib.metadata.version("pulumi_aws"),
+        "components": {
+            name: summarize([measure(lambda: run(build)) for _ in range(repeat)])
+            for name, build in COMPONENTS.items()
+        },
+        "stack": summarize(
+            [measure(lambda: run_program(stack_config(0))) for _ in range(repeat)]
+        ),
+    }
+
+    results["stacks"] = benchmark_stacks(stacks)
+    return results
+
+
+def benchmark_stacks(stacks):
+    """
+    Builds N parameterised stacks one after the other in the same process,
+    once for time and once under tracemalloc for memory.
+    """
+    started = time.perf_counter()
+    runs = [run_program(stack_config(index)) for index in range(stacks)]
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    retained = []
+    for index in range(stacks):
+        run_program(stack_config(index))
+        retained.append(tracemalloc.get_traced_memory()[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "count": stacks,
+        "resources": sum(len(stack_run.resources) for stack_run in runs),
+        "wall_ms": round(wall_ms, 1),
+        "construction_ms_per_stack": round(
+            statistics.median(stack_run.construction_seconds for stack_run in runs)
+            * 1000,
+            1,
+        ),
+        "peak_memory_kb": round(peak / 1024, 1),
+        # Memory still held after each further stack, which should stay near 0
+        "retained_memory_kb_per_stack": round(
+            (retained[-1] - retained[0]) / max(stacks - 1, 1) / 1024, 1
+        ),
+    }
+
+
+def graph_counts(results):
+    """
+    The resource and Output counts of benchmark results, which unlike the
+    timings only change with the resource graph.
+    """
+    counts = {
+        name: {metric: component[metric] for metric in ("resources", "outputs")}
+        for name, component in results["components"].items()
+    }
+    counts["stack"] = {
+        metric: results["stack"][metric] for metric in ("resources", "outputs")
+    }
+    counts["stacks"] = {
+        metric: results["stacks"][metric] for metric in ("count", "resources")
+    }
+    return counts
+
+
+def stale_counts(results_path=RESULTS_FILE):
+    """
+    Counts of the committed results that differ from a fresh run, as
+    (name, committed, fresh) tuples.
+    """
+    with open(results_path) as results_file:
+        committed = graph_counts(json.load(results_file))
+    fresh = graph_counts(benchmark(committed["stacks"]["count"], repeat=1))
+    return [
+        (name, committed.get(name), counts)
+        for name, counts in fresh.items()
+        if committed.get(name) != counts
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stacks", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare the counts in --output with a fresh run instead of writing",
+    )
+    cli_args = parser.parse_args()
+
+    if cli_args.check:
+        stale = stale_counts(cli_args.output)
+        for name, committed, fresh in stale:
+            print(f"{name}: committed {committed}, fresh {fresh}")
+        if stale:
+            sys.exit(f"{cli_args.output} is stale, regenerate it")
+        return
+
+    results = benchmark(cli_args.stacks, cli_args.repeat)
+
+    os.makedirs(os.path.dirname(cli_args.output), exist_ok=True)
+    with open(cli_args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+        output_file.write("\n")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures how long the program takes to construct under mocks when every
+provider invoke costs a simulated round-trip.
+
+    python benchmarks/preview_time.py --invoke-latency 0.3 --runs 5 \
+        --config '{"access_logs": true}'
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mocks import run_program  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invoke-latency", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--config", type=json.loads, default={}, help="stack config, as JSON"
+    )
+    cli_args = parser.parse_args()
+
+    runs = [
+        run_program(cli_args.config, invoke_latency=cli_args.invoke_latency)
+        for _ in range(cli_args.runs)
+    ]
+
+    print(
+        json.dumps(
+            {
+                "invoke_latency_seconds": cli_args.invoke_latency,
+                "runs": cli_args.runs,
+                "resources": len(runs[0].resources),
+                "invokes": len(runs[0].invokes),
+                "construction_seconds": round(
+                    statistics.median(run.construction_seconds for run in runs), 3
+                ),
+                "total_seconds": round(
+                    statistics.median(run.total_seconds for run in runs), 3
+                ),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Measures the startup of the program: the time spent importing modules, from
+`-X importtime`, and the wall-clock construction under mocks, for each layer.
+Every run is a fresh interpreter, as the language host is on each preview.
+
+    python benchmarks/startup_time.py --runs 5
+
+Exits non-zero when a median exceeds its budget in startup_budget.json, which
+tests/test_benchmarks.py also checks on every test run. The budgets leave
+about half again the medians measured when they were set; raise them in the
+change that adds the imports, not to make an unrelated one pass.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGET_FILE = os.path.join(BENCHMARKS_DIR, "startup_budget.json")
+MARKER = "-- program --"
+
+SCENARIOS = {
+    "all": {},
+    "network": {"layer": "network"},
+    "data": {
+        "layer": "data",
+        "network_stack": "lago/lago-pulumi/network",
+    },
+    "app": {
+        "layer": "app",
+        "network_stack": "lago/lago-pulumi/network",
+        "data_stack": "lago/lago-pulumi/data",
+    },
+}
+
+
+def child(scenario):
+    """
+    Runs one scenario and prints its construction time as JSON.
+    """
+    sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+    from benchmarks.mocks import run_program
+
+    # run_program() resets the lookup caches, which is the harness' doing
+    import lookups  # noqa: F401
+
+    # Imports after the marker are the program's, not the harness'
+    sys.stderr.write(f"{MARKER}\n")
+    sys.stderr.flush()
+    run = run_program(SCENARIOS[scenario])
+    print(
+        json.dumps(
+            {
+                "construction_ms": run.construction_seconds * 1000,
+                "total_ms": run.total_seconds * 1000,
+            }
+        )
+    )
+
+
+def program_imports(stderr):
+    """
+    Cumulative import time in ms of the program's top-level imports, grouped
+    by package, and by service module for pulumi_aws.
+    """
+    imports = {}
+    lines = stderr.split(f"{MARKER}\n", 1)[-1].splitlines()
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented below the import that made them
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        package = ".".join(
+            name.split(".")[: 2 if name.startswith("pulumi_aws.") else 1]
+        )
+        imports[package] = imports.get(package, 0) + int(cumulative) / 1000
+    return imports
+
+
+def measure(scenario):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "--child", scenario],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = program_imports(process.stderr)
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["import_ms"] = sum(imports.values())
+    result["imports"] = imports
+    return result
+
+
+def benchmark(runs=5):
+    """
+    Median timings of each scenario over `runs` runs, with the heaviest
+    imports of the last run.
+    """
+    results = {}
+    for scenario in SCENARIOS:
+        scenario_runs = [measure(scenario) for _ in range(runs)]
+        heaviest = sorted(
+            scenario_runs[-1]["imports"].items(), key=lambda item: item[1], reverse=True
+        )
+        results[scenario] = {
+            metric: round(statistics.median(run[metric] for run in scenario_runs), 1)
+            for metric in ("import_ms", "construction_ms", "total_ms")
+        }
+        results[scenario]["heaviest_imports"] = {
+            name: round(ms, 1) for name, ms in heaviest[:5]
+        }
+    return results
+
+
+def over_budget(results, budget_path=BUDGET_FILE):
+    """
+    The medians exceeding their budget, one line each.
+    """
+    with open(budget_path) as budget_file:
+        budget = json.load(budget_file)
+
+    return [
+        f"{scenario} {metric}: {results[scenario][metric]}ms > {limit}ms"
+        for scenario, limits in budget.items()
+        for metric, limit in limits.items()
+        if results[scenario][metric] > limit
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=BUDGET_FILE)
+    parser.add_argument("--no-budget", action="store_true")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    cli_args = parser.parse_args()
+
+    if cli_args.child:
+        child(cli_args.child)
+        return
+
+    results = benchmark(cli_args.runs)
+    print(json.dumps(results, indent=2))
+
+    if cli_args.no_budget:
+        return
+
+    failures = over_budget(results, cli_args.budget)
+    if failures:
+        sys.exit("Startup over budget:\n" + "\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import json
+
+from pulumi import ComponentResource, Output, ResourceOptions
+from pulumi_aws import codedeploy, iam
+
+# Traffic shifting strategies mapped to the predefined CodeDeploy ECS configs
+TRAFFIC_SHIFTS = {
+    "all_at_once": "CodeDeployDefault.ECSAllAtOnce",
+    "linear": "CodeDeployDefault.ECSLinear10PercentEvery1Minutes",
+    "canary": "CodeDeployDefault.ECSCanary10Percent5Minutes",
+}
+
+
+class BlueGreenArgs:
+
+    def __init__(
+        self,
+        cluster_arn=None,
+        service_name=None,
+        prod_listener_arn=None,
+        test_listener_arn=None,
+        blue_target_group_name=None,
+        green_target_group_name=None,
+        traffic_shift="linear",
+        termination_wait_time_in_minutes=5,
+    ):
+        self.cluster_arn = cluster_arn
+        self.service_name = service_name
+        self.prod_listener_arn = prod_listener_arn
+        self.test_listener_arn = test_listener_arn
+        self.blue_target_group_name = blue_target_group_name
+        self.green_target_group_name = green_target_group_name
+        self.traffic_shift = traffic_shift
+        self.termination_wait_time_in_minutes = termination_wait_time_in_minutes
+
+
+class BlueGreen(ComponentResource):
+    """
+    CodeDeploy application and deployment group shifting an ECS service
+    between two target groups behind a production and a test listener.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        args: BlueGreenArgs,
+        opts: ResourceOptions = None,
+    ):
+        super().__init__("custom:resource:BlueGreen", name, {}, opts)
+
+        deployment_config_name = TRAFFIC_SHIFTS.get(
+            args.traffic_shift, args.traffic_shift
+        )
+
+        self.role = iam.Role(
+            f"{name}-role",
+            assume_role_policy=json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Principal": {"Service": "codedeploy.amazonaws.com"},
+                            "Action": "sts:AssumeRole",
+                        }
+                    ],
+                }
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        iam.RolePolicyAttachment(
+            f"{name}-role-policy",
+            role=self.role.name,
+            policy_arn="arn:aws:iam::aws:policy/AWSCodeDeployRoleForECS",
+            opts=ResourceOptions(parent=self),
+        )
+
+        self.application = codedeploy.Application(
+            f"{name}-app",
+            compute_platform="ECS",
+            opts=ResourceOptions(parent=self),
+        )
+
+        cluster_name = Output.from_input(args.cluster_arn).apply(
+            lambda arn: arn.split("/")[-1]
+        )
+
+        self.deployment_group = codedeploy.DeploymentGroup(
+            f"{name}-dg",
+            app_name=self.application.name,
+            deployment_group_name=f"{name}-dg",
+            service_role_arn=self.role.arn,
+            deployment_config_name=deployment_config_name,
+            deployment_style=codedeploy.DeploymentGroupDeploymentStyleArgs(
+                deployment_option="WITH_TRAFFIC_CONTROL",
+                deployment_type="BLUE_GREEN",
+            ),
+            blue_green_deployment_config=codedeploy.DeploymentGroupBlueGreenDeploymentConfigArgs(
+                deployment_ready_option=codedeploy.DeploymentGroupBlueGreenDeploymentConfigDeploymentReadyOptionArgs(
+                    action_on_timeout="CONTINUE_DEPLOYMENT",
+                ),
+                terminate_blue_instances_on_deployment_success=codedeploy.DeploymentGroupBlueGreenDeploymentConfigTerminateBlueInstancesOnDeploymentSuccessArgs(
+                    action="TERMINATE",
+                    termination_wait_time_in_minutes=args.termination_wait_time_in_minutes,
+                ),
+            ),
+            auto_rollback_configuration=codedeploy.DeploymentGroupAutoRollbackConfigurationArgs(
+                enabled=True,
+                events=["DEPLOYMENT_FAILURE", "DEPLOYMENT_STOP_ON_ALARM"],
+            ),
+            ecs_service=codedeploy.DeploymentGroupEcsServiceArgs(
+                cluster_name=cluster_name,
+                service_name=args.service_name,
+            ),
+            load_balancer_info=codedeploy.DeploymentGroupLoadBalancerInfoArgs(
+                target_group_pair_info=codedeploy.DeploymentGroupLoadBalancerInfoTargetGroupPairInfoArgs(
+                    prod_traffic_route=codedeploy.DeploymentGroupLoadBalancerInfoTargetGroupPairInfoProdTrafficRouteArgs(
+                        listener_arns=[args.prod_listener_arn],
+                    ),
+                    test_traffic_route=codedeploy.DeploymentGroupLoadBalancerInfoTargetGroupPairInfoTestTrafficRouteArgs(
+                        listener_arns=[args.test_listener_arn],
+                    ),
+                    target_groups=[
+                        codedeploy.DeploymentGroupLoadBalancerInfoTargetGroupPairInfoTargetGroupArgs(
+                            name=args.blue_target_group_name,
+                        ),
+                        codedeploy.DeploymentGroupLoadBalancerInfoTargetGroupPairInfoTargetGroupArgs(
+                            name=args.green_target_group_name,
+                        ),
+                    ],
+                ),
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        self.register_outputs({})
+
+    def app_spec(self, task_definition_arn, container_name, container_port):
+        """
+        AppSpec to pass to `aws deploy create-deployment` for a new task definition.
+        """
+        return Output.json_dumps(
+            {
+                "version": 0.0,
+                "Resources": [
+                    {
+                        "TargetService": {
+                            "Type": "AWS::ECS::Service",
+                            "Properties": {
+                                "TaskDefinition": task_definition_arn,
+                                "LoadBalancerInfo": {
+                                    "ContainerName": container_name,
+                                    "ContainerPort": container_port,
+                                },
+                            },
+                        }
+                    }
+                ],
+            }
+        )
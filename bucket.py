@@ -1,7 +1,7 @@
 import json
 
 from pulumi import ComponentResource, ResourceOptions
-from pulumi_aws import ecs, iam, s3
+from pulumi_aws import iam, s3
 
 
 class BucketArgs:
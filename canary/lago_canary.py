@@ -0,0 +1,198 @@
+"""
+Latency canary for a deployed Lago stack.
+
+Runs inside a CloudWatch Synthetics Python canary, and can be run locally
+against any Lago deployment or stub server:
+
+    python canary/lago_canary.py --api-url http://localhost:3000 --front-url http://localhost:8080
+"""
+
+import argparse
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+METRIC_NAMESPACE = "Lago/Canary"
+
+
+def timed_request(url, method="GET", headers=None, body=None, timeout=10):
+    """
+    Sends one HTTP request and returns its status code and latency in milliseconds.
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(
+        url,
+        data=data,
+        method=method,
+        headers={"Content-Type": "application/json", **(headers or {})},
+    )
+
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except (urllib.error.URLError, TimeoutError):
+        status = 0
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    return status, latency_ms
+
+
+def checks(api_url, front_url, api_key=None, customer_id=None, metric_code=None):
+    """
+    Requests to run, as (name, method, url, headers, body) tuples.
+
+    The authenticated read and event ingestion only run when an API key is
+    given, and ingestion also needs a sandbox customer and a metric code.
+    """
+    api_url = api_url.rstrip("/")
+    front_url = front_url.rstrip("/")
+
+    planned = [
+        ("api-health", "GET", f"{api_url}/health", None, None),
+        ("front", "GET", f"{front_url}/", None, None),
+    ]
+
+    if api_key:
+        headers = {"Authorization": f"Bearer {api_key}"}
+        planned.append(
+            (
+                "api-read",
+                "GET",
+                f"{api_url}/api/v1/billable_metrics?per_page=1",
+                headers,
+                None,
+            )
+        )
+
+        if customer_id and metric_code:
+            event = {
+                "event": {
+                    "transaction_id": f"canary-{uuid.uuid4()}",
+                    "external_customer_id": customer_id,
+                    "code": metric_code,
+                    "timestamp": int(datetime.now(timezone.utc).timestamp()),
+                    "properties": {},
+                }
+            }
+            planned.append(
+                ("api-ingest", "POST", f"{api_url}/api/v1/events", headers, event)
+            )
+
+    return planned
+
+
+def run_checks(api_url, front_url, api_key=None, customer_id=None, metric_code=None):
+    """
+    Runs every check and returns one result per check.
+    """
+    results = []
+    for name, method, url, headers, body in checks(
+        api_url, front_url, api_key, customer_id, metric_code
+    ):
+        status, latency_ms = timed_request(url, method, headers, body)
+        results.append(
+            {
+                "check": name,
+                "status": status,
+                "ok": 200 <= status < 300,
+                "latency_ms": round(latency_ms, 2),
+            }
+        )
+    return results
+
+
+def metric_data(results, canary_name=None):
+    """
+    CloudWatch metric data recording the latency and success of each check,
+    under the canary's name so canaries of different stacks in the same
+    account and region keep their metrics apart.
+    """
+    data = []
+    for result in results:
+        dimensions = [{"Name": "Check", "Value": result["check"]}]
+        if canary_name:
+            dimensions.insert(0, {"Name": "Canary", "Value": canary_name})
+        data.append(
+            {
+                "MetricName": "Latency",
+                "Dimensions": dimensions,
+                "Value": result["latency_ms"],
+                "Unit": "Milliseconds",
+            }
+        )
+        data.append(
+            {
+                "MetricName": "Success",
+                "Dimensions": dimensions,
+                "Value": 1 if result["ok"] else 0,
+                "Unit": "Count",
+            }
+        )
+    return data
+
+
+def handler(event, context):
+    """
+    Synthetics entrypoint: reads the API key from its parameter, runs the
+    checks, publishes metrics and fails the canary run when any check fails.
+    """
+    import boto3
+
+    # The key lives in a SecureString parameter rather than the run config,
+    # whose environment variables show in the console
+    api_key = None
+    if os.environ.get("API_KEY_PARAMETER"):
+        api_key = boto3.client("ssm").get_parameter(
+            Name=os.environ["API_KEY_PARAMETER"], WithDecryption=True
+        )["Parameter"]["Value"]
+
+    results = run_checks(
+        os.environ["API_URL"],
+        os.environ["FRONT_URL"],
+        api_key,
+        os.environ.get("CUSTOMER_ID"),
+        os.environ.get("METRIC_CODE"),
+    )
+    print(json.dumps(results))
+
+    boto3.client("cloudwatch").put_metric_data(
+        Namespace=METRIC_NAMESPACE,
+        MetricData=metric_data(results, os.environ.get("CANARY_NAME")),
+    )
+
+    failed = [result["check"] for result in results if not result["ok"]]
+    if failed:
+        raise Exception(f"Failed checks: {', '.join(failed)}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--api-url", required=True)
+    parser.add_argument("--front-url", required=True)
+    parser.add_argument("--api-key")
+    parser.add_argument("--customer-id")
+    parser.add_argument("--metric-code")
+    cli_args = parser.parse_args()
+
+    print(
+        json.dumps(
+            run_checks(
+                cli_args.api_url,
+                cli_args.front_url,
+                cli_args.api_key,
+                cli_args.customer_id,
+                cli_args.metric_code,
+            ),
+            indent=2,
+        )
+    )
@@ -1,7 +1,19 @@
 import json
+import lookups
 
 from pulumi import ComponentResource, ResourceOptions
-from pulumi_aws import ecs, iam, config, get_caller_identity
+from pulumi_aws import ecs, iam, config
+
+
+class ClusterArgs:
+
+    def __init__(
+        self,
+        tracing=False,
+        container_insights=True,
+    ):
+        self.tracing = tracing
+        self.container_insights = container_insights
 
 
 class Cluster(ComponentResource):
@@ -9,13 +21,22 @@ class Cluster(ComponentResource):
     def __init__(
         self,
         name: str,
+        args: ClusterArgs = None,
         opts: ResourceOptions = None,
     ):
         super().__init__("custom:resource:Cluster", name, {}, opts)
 
+        args = args or ClusterArgs()
+
         # Create an AWS ECS Cluster
         self.cluster = ecs.Cluster(
             f"{name}",
+            settings=[
+                ecs.ClusterSettingArgs(
+                    name="containerInsights",
+                    value="enabled" if args.container_insights else "disabled",
+                )
+            ],
             opts=ResourceOptions(parent=self),
         )
 
@@ -46,26 +67,28 @@ class Cluster(ComponentResource):
 
         self.log_policy = iam.Policy(
             f"{name}-task-log-policy",
-            policy=json.dumps(
-                {
-                    "Version": "2012-10-17",
-                    "Statement": [
-                        {
-                            "Effect": "Allow",
-                            "Action": [
-                                "logs:CreateLogGroup",
-                                "logs:CreateLogStream",
-                                "logs:PutLogEvents",
-                                "logs:DescribeLogStreams",
-                            ],
-                            # Broad resource specification; consider narrowing down
-                            "Resource": [
-                                f"arn:aws:logs:{config.region}:{get_caller_identity().account_id}:log-group:/ecs/*",
-                                f"arn:aws:logs:{config.region}:{get_caller_identity().account_id}:log-group:/ecs/*:log-stream:*",
-                            ],
-                        }
-                    ],
-                }
+            policy=lookups.caller_identity().account_id.apply(
+                lambda account_id: json.dumps(
+                    {
+                        "Version": "2012-10-17",
+                        "Statement": [
+                            {
+                                "Effect": "Allow",
+                                "Action": [
+                                    "logs:CreateLogGroup",
+                                    "logs:CreateLogStream",
+                                    "logs:PutLogEvents",
+                                    "logs:DescribeLogStreams",
+                                ],
+                                # Broad resource specification; consider narrowing down
+                                "Resource": [
+                                    f"arn:aws:logs:{config.region}:{account_id}:log-group:/ecs/*",
+                                    f"arn:aws:logs:{config.region}:{account_id}:log-group:/ecs/*:log-stream:*",
+                                ],
+                            }
+                        ],
+                    }
+                )
             ),
             opts=ResourceOptions(parent=self),
         )
@@ -76,4 +99,13 @@ class Cluster(ComponentResource):
             opts=ResourceOptions(parent=self),
         )
 
+        # Allow the OpenTelemetry collector sidecars to export to X-Ray
+        if args.tracing:
+            iam.RolePolicyAttachment(
+                f"{name}-task-xray-policy-attachment",
+                policy_arn="arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess",
+                role=self.role.name,
+                opts=ResourceOptions(parent=self),
+            )
+
         self.register_outputs({})
@@ -0,0 +1,359 @@
+"""
+Profiles a deployment from Pulumi engine events: how long each resource took
+to create or update, which chain of dependent resources bounded the total
+time, and how much of the work ran in parallel.
+
+From an event log written by `pulumi up --event-log events.jsonl`:
+
+    python critical_path.py events.jsonl --state state.json
+
+or live, running `pulumi up` on a stack of this project:
+
+    python critical_path.py --up --stack dev
+
+The dependencies come from a `pulumi stack export` (--state), from the stack
+itself when live, or else from the program run under mocks with --config.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from pulumi.automation import events as engine_events
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Operations that create or change a resource, which its dependents wait on
+WAITED_OPS = {"create", "update", "create-replacement", "import", "read"}
+
+
+def resource_key(urn):
+    """
+    The type chain and name of a URN, without its stack and project, so URNs
+    of the same resource in different stacks and in mocks compare equal.
+    """
+    type_chain, name = urn.split("::")[2:4]
+    if type_chain.startswith("pulumi:pulumi:Stack$"):
+        type_chain = type_chain[len("pulumi:pulumi:Stack$") :]
+    return f"{type_chain}::{name}"
+
+
+class Step:
+
+    def __init__(self, key, type, op, parent=None, custom=True):
+        self.key = key
+        self.type = type
+        self.op = op
+        # Key of the parent resource, None for the stack's children
+        self.parent = parent
+        self.custom = custom
+        self.start = None
+        self.end = None
+        self.failed = False
+
+    @property
+    def name(self):
+        return self.key.split("::")[-1]
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+def read_event_log(path):
+    """
+    Engine events of a JSON lines event log.
+    """
+    with open(path) as log_file:
+        return [
+            engine_events.EngineEvent.from_json(json.loads(line))
+            for line in log_file
+            if line.strip()
+        ]
+
+
+def collect_steps(events):
+    """
+    The steps resources are waited on for, by resource key, timed from the
+    events emitted before and after each.
+    """
+    steps = {}
+    for event in sorted(events, key=lambda event: event.sequence):
+        pre = event.resource_pre_event
+        if pre and not pre.planning and pre.metadata.op.value in WAITED_OPS:
+            metadata = pre.metadata
+            state = metadata.new or metadata.old
+            parent = state.parent if state else None
+            step = Step(
+                resource_key(metadata.urn),
+                metadata.type,
+                metadata.op.value,
+                parent=(
+                    resource_key(parent)
+                    if parent and "pulumi:pulumi:Stack::" not in parent
+                    else None
+                ),
+                custom=state.custom if state else True,
+            )
+            step.start = event.timestamp
+            steps[step.key] = step
+            continue
+
+        done = event.res_outputs_event or event.res_op_failed_event
+        if done:
+            step = steps.get(resource_key(done.metadata.urn))
+            if step and step.end is None:
+                step.end = event.timestamp
+                step.failed = event.res_op_failed_event is not None
+
+    return {key: step for key, step in steps.items() if step.end is not None}
+
+
+def state_dependencies(deployment):
+    """
+    Dependencies by resource key, from the deployment of a stack export.
+    """
+    deployment = deployment.get("deployment", deployment)
+    return {
+        resource_key(resource["urn"]): [
+            resource_key(urn) for urn in resource.get("dependencies") or []
+        ]
+        for resource in deployment.get("resources") or []
+    }
+
+
+def program_dependencies(config=None):
+    """
+    Dependencies by resource key, from the program run under mocks.
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    from benchmarks.mocks import run_program
+
+    program_run = run_program(config)
+    return {
+        resource_key(urn): [resource_key(dependency) for dependency in dependencies]
+        for urn, dependencies in program_run.dependency_urns.items()
+    }
+
+
+class Profile:
+    """
+    The timings of a deployment's steps, analysed over its dependency graph.
+    """
+
+    def __init__(self, steps, dependencies):
+        self.steps = {key: step for key, step in steps.items() if step.custom}
+        children = {}
+        for step in steps.values():
+            children.setdefault(step.parent, []).append(step.key)
+        self.children = children
+        self.parents = {
+            child: parent for parent, keys in children.items() for child in keys
+        }
+        self.dependencies = {
+            key: self._waited_on(dependencies.get(key, [])) for key in self.steps
+        }
+
+    def _waited_on(self, keys):
+        """
+        The timed resources behind dependencies, as depending on a component
+        means waiting on everything it contains.
+        """
+        waited = set()
+        pending = list(keys)
+        while pending:
+            key = pending.pop()
+            if key in self.steps:
+                waited.add(key)
+            pending.extend(self.children.get(key, []))
+        return waited
+
+    @property
+    def started(self):
+        return min(step.start for step in self.steps.values())
+
+    @property
+    def ended(self):
+        return max(step.end for step in self.steps.values())
+
+    @property
+    def wall_time(self):
+        return self.ended - self.started
+
+    @property
+    def busy_time(self):
+        return sum(step.duration for step in self.steps.values())
+
+    @property
+    def parallelism(self):
+        """
+        Average number of resources in progress over the deployment.
+        """
+        return self.busy_time / self.wall_time if self.wall_time else 1.0
+
+    @property
+    def peak_concurrency(self):
+        edges = sorted(
+            [(step.start, 1) for step in self.steps.values()]
+            + [(step.end, -1) for step in self.steps.values()]
+        )
+        running = peak = 0
+        for _, change in edges:
+            running += change
+            peak = max(peak, running)
+        return peak
+
+    def critical_path(self):
+        """
+        The chain of resources bounding the deployment, walked back from the
+        last one to finish through the dependency each one waited on last.
+        """
+        key = max(self.steps, key=lambda key: (self.steps[key].end, key))
+        path = [self.steps[key]]
+        while self.dependencies[key]:
+            key = max(
+                self.dependencies[key], key=lambda key: (self.steps[key].end, key)
+            )
+            path.append(self.steps[key])
+        return list(reversed(path))
+
+    def component(self, step):
+        """
+        Name of the top-level component a step belongs to, "(stack)" for the
+        resources created by the program itself.
+        """
+        key = step.key
+        if not self.parents.get(key):
+            return "(stack)"
+        while self.parents.get(key):
+            key = self.parents[key]
+        return key.split("::")[-1]
+
+    def components(self):
+        """
+        Start, end and busy time of each top-level component.
+        """
+        spans = {}
+        for step in self.steps.values():
+            component = self.component(step)
+            start, end, busy = spans.get(component, (step.start, step.end, 0))
+            spans[component] = (
+                min(start, step.start),
+                max(end, step.end),
+                busy + step.duration,
+            )
+        return spans
+
+    def report(self):
+        path = self.critical_path()
+        return {
+            "wall_seconds": self.wall_time,
+            "busy_seconds": self.busy_time,
+            "parallelism": round(self.parallelism, 2),
+            "peak_concurrency": self.peak_concurrency,
+            "critical_path": [
+                {
+                    "resource": step.name,
+                    "type": step.type,
+                    "op": step.op,
+                    "start": step.start - self.started,
+                    "seconds": step.duration,
+                    # Time spent waiting after the previous resource of the path
+                    "waited": step.start - previous.end if previous else 0,
+                    "failed": step.failed,
+                }
+                for previous, step in zip([None] + path[:-1], path)
+            ],
+            "components": {
+                name: {
+                    "start": start - self.started,
+                    "end": end - self.started,
+                    "busy_seconds": busy,
+                }
+                for name, (start, end, busy) in sorted(
+                    self.components().items(), key=lambda item: item[1][0]
+                )
+            },
+            "slowest": [
+                {"resource": step.name, "op": step.op, "seconds": step.duration}
+                for step in sorted(
+                    self.steps.values(), key=lambda step: step.duration, reverse=True
+                )[:10]
+            ],
+        }
+
+
+def format_report(report):
+    lines = [
+        f"Wall time {report['wall_seconds']}s, resources busy for "
+        f"{report['busy_seconds']}s: parallelism {report['parallelism']}, "
+        f"at most {report['peak_concurrency']} at once",
+        "",
+        "Critical path:",
+    ]
+    for entry in report["critical_path"]:
+        waited = f" (+{entry['waited']}s wait)" if entry["waited"] else ""
+        failed = " FAILED" if entry["failed"] else ""
+        lines.append(
+            f"  {entry['start']:>6}s {entry['seconds']:>5}s  {entry['op']:<7} "
+            f"{entry['resource']} [{entry['type']}]{waited}{failed}"
+        )
+    lines += ["", "Components:"]
+    for name, span in report["components"].items():
+        lines.append(
+            f"  {name:<32} {span['start']:>6}s -> {span['end']:>6}s, "
+            f"busy {span['busy_seconds']}s"
+        )
+    return "\n".join(lines)
+
+
+def live_events(stack_name, log=print):
+    """
+    Runs `pulumi up` on a stack of this project and returns its engine events
+    and the dependencies of its resulting state.
+    """
+    from pulumi import automation as auto
+
+    stack = auto.select_stack(stack_name=stack_name, work_dir=PROJECT_DIR)
+    events = []
+    stack.up(on_event=events.append, on_output=log)
+    return events, state_dependencies(stack.export_stack().deployment)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("event_log", nargs="?", help="JSON lines engine event log")
+    parser.add_argument("--state", help="`pulumi stack export` of the deployment")
+    parser.add_argument(
+        "--config", type=json.loads, help="stack config to run the program with"
+    )
+    parser.add_argument("--up", action="store_true", help="run `pulumi up` live")
+    parser.add_argument("--stack", help="stack to run live")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    cli_args = parser.parse_args()
+
+    if cli_args.up:
+        if not cli_args.stack:
+            parser.error("--up needs --stack")
+        events, dependencies = live_events(cli_args.stack, log=sys.stderr.write)
+    elif cli_args.event_log:
+        events = read_event_log(cli_args.event_log)
+        if cli_args.state:
+            with open(cli_args.state) as state_file:
+                dependencies = state_dependencies(json.load(state_file))
+        else:
+            dependencies = program_dependencies(cli_args.config)
+    else:
+        parser.error("give an event log, or --up and --stack")
+
+    steps = collect_steps(events)
+    if not steps:
+        sys.exit("No resource was created or updated")
+
+    report = Profile(steps, dependencies).report()
+    print(json.dumps(report, indent=2) if cli_args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
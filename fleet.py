@@ -0,0 +1,245 @@
+"""
+Previews or updates a fleet of Lago stacks in parallel through the Automation
+API, running __main__.py as an inline program for each of them.
+
+    python fleet.py fleet.yaml preview --concurrency 4
+    python fleet.py fleet.yaml up --continue-on-error --backend file://~/.lago-state
+
+The fleet file lists the stacks and their config. Config given at the top
+level applies to every stack, and each stack's own config is laid over it:
+
+    config:
+      lago_version: "1.20.0"
+      aws:region: eu-west-1
+    stacks:
+      acme-eu:
+        config:
+          service_name: acme
+      globex-us:
+        config:
+          service_name: globex
+          aws:region: us-east-1
+          db_password:
+            value: hunter2
+            secret: true
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+
+import yaml
+from pulumi import automation as auto
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_NAME = "lago-pulumi"
+
+
+class StackSpec:
+
+    def __init__(self, name, config=None):
+        self.name = name
+        # Config by key; keys without a namespace belong to the project
+        self.config = config or {}
+
+
+class StackResult:
+
+    def __init__(self, name, status, duration=0.0, changes=None, error=None):
+        self.name = name
+        # One of "succeeded", "failed" or "skipped"
+        self.status = status
+        self.duration = duration
+        self.changes = changes or {}
+        self.error = error
+
+
+def load_fleet(path):
+    """
+    Stack specs of a fleet file, with the fleet config laid under each stack's.
+    """
+    with open(path) as fleet_file:
+        fleet = yaml.safe_load(fleet_file) or {}
+
+    common = fleet.get("config") or {}
+    return [
+        StackSpec(name, {**common, **((stack or {}).get("config") or {})})
+        for name, stack in (fleet.get("stacks") or {}).items()
+    ]
+
+
+def config_values(config):
+    """
+    Automation API config values of a stack spec's config, with project keys
+    namespaced and structured values JSON-encoded for Config.get_object.
+    """
+    values = {}
+    for key, value in config.items():
+        secret = False
+        if isinstance(value, dict) and "value" in value:
+            secret = bool(value.get("secret"))
+            value = value["value"]
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        elif isinstance(value, bool):
+            value = str(value).lower()
+        key = key if ":" in key else f"{PROJECT_NAME}:{key}"
+        values[key] = auto.ConfigValue(value=str(value), secret=secret)
+    return values
+
+
+def program():
+    """
+    The Pulumi program, run inline.
+    """
+    runpy.run_path(os.path.join(PROJECT_DIR, "__main__.py"), run_name="__main__")
+
+
+def select_stack(spec, backend_url=None, secrets_provider=None):
+    """
+    Creates or selects the stack of a spec and sets its config.
+    """
+    project_settings = auto.ProjectSettings(
+        name=PROJECT_NAME,
+        runtime="python",
+        backend=auto.ProjectBackend(url=backend_url) if backend_url else None,
+    )
+    stack = auto.create_or_select_stack(
+        stack_name=spec.name,
+        project_name=PROJECT_NAME,
+        program=program,
+        opts=auto.LocalWorkspaceOptions(
+            project_settings=project_settings,
+            secrets_provider=secrets_provider,
+        ),
+    )
+    stack.set_all_config(config_values(spec.config))
+    return stack
+
+
+def run_stack(spec, operation, backend_url=None, secrets_provider=None, log=print):
+    """
+    Previews or updates one stack, and returns the number of resources per
+    kind of change.
+    """
+    stack = select_stack(spec, backend_url, secrets_provider)
+
+    def on_output(line):
+        log(f"[{spec.name}] {line.rstrip()}")
+
+    if operation == "preview":
+        result = stack.preview(on_output=on_output)
+        changes = result.change_summary
+    else:
+        result = stack.up(on_output=on_output)
+        changes = result.summary.resource_changes or {}
+
+    return {str(getattr(kind, "value", kind)): count for kind, count in changes.items()}
+
+
+class Fleet:
+    """
+    Runs an operation over stacks, at most `concurrency` at a time.
+
+    When continue_on_error is off, the first failure stops stacks that have
+    not started yet; stacks already running are left to finish.
+    """
+
+    def __init__(
+        self,
+        stacks,
+        operation="preview",
+        concurrency=4,
+        continue_on_error=False,
+        run_stack=run_stack,
+        log=print,
+    ):
+        self.stacks = stacks
+        self.operation = operation
+        self.concurrency = concurrency
+        self.continue_on_error = continue_on_error
+        self.run_stack = run_stack
+        self.log = log
+        self.failed = threading.Event()
+
+    def _run(self, spec):
+        if self.failed.is_set() and not self.continue_on_error:
+            return StackResult(spec.name, "skipped")
+
+        started = time.perf_counter()
+        try:
+            changes = self.run_stack(spec, self.operation)
+        except Exception as error:
+            self.failed.set()
+            self.log(f"[{spec.name}] {self.operation} failed: {error}")
+            return StackResult(
+                spec.name, "failed", time.perf_counter() - started, error=str(error)
+            )
+        return StackResult(
+            spec.name, "succeeded", time.perf_counter() - started, changes
+        )
+
+    def run(self):
+        """
+        Runs the operation and returns the stack results, in fleet order.
+        """
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency
+        ) as executor:
+            return list(executor.map(self._run, self.stacks))
+
+
+def summary(results):
+    """
+    A table of the status, duration and changes of each stack.
+    """
+    lines = [f"{'STACK':<24} {'STATUS':<10} {'DURATION':>9}  CHANGES"]
+    for result in results:
+        changes = " ".join(
+            f"{kind}={count}" for kind, count in sorted(result.changes.items())
+        )
+        lines.append(
+            f"{result.name:<24} {result.status:<10} {result.duration:>8.1f}s  "
+            f"{changes or result.error or '-'}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("fleet", help="fleet file")
+    parser.add_argument("operation", choices=["preview", "up"])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--continue-on-error", action="store_true")
+    parser.add_argument("--stack", action="append", help="only run these stacks")
+    parser.add_argument("--backend", help="state backend URL, e.g. file://~/.state")
+    parser.add_argument("--secrets-provider", help="e.g. passphrase or awskms://...")
+    cli_args = parser.parse_args()
+
+    stacks = load_fleet(cli_args.fleet)
+    if cli_args.stack:
+        stacks = [spec for spec in stacks if spec.name in cli_args.stack]
+
+    def run(spec, operation):
+        return run_stack(spec, operation, cli_args.backend, cli_args.secrets_provider)
+
+    results = Fleet(
+        stacks,
+        operation=cli_args.operation,
+        concurrency=cli_args.concurrency,
+        continue_on_error=cli_args.continue_on_error,
+        run_stack=run,
+    ).run()
+
+    print(summary(results))
+    if any(result.status != "succeeded" for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
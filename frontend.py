@@ -1,7 +1,8 @@
-import json
+import bluegreen
+import logs
 
 from pulumi import ComponentResource, Output, ResourceOptions
-from pulumi_aws import lb, iam, ecs, cloudwatch, config, get_caller_identity
+from pulumi_aws import lb, ecs
 
 
 class FrontendArgs:
@@ -16,6 +17,18 @@ class FrontendArgs:
         security_group_ids=None,
         api_url=None,
         alb_arn=None,
+        bucket_name=None,
+        log_retention_days=14,
+        log_max_buffer_size="25m",
+        log_router=None,
+        deregistration_delay=10,
+        health_check_grace_period_seconds=15,
+        deployment_minimum_healthy_percent=100,
+        deployment_maximum_percent=200,
+        deployment_controller="ECS",
+        traffic_shift="linear",
+        test_listener_port=8080,
+        desired_count=1,
     ):
         self.lago_version = lago_version
         self.cluster_arn = cluster_arn
@@ -25,6 +38,18 @@ class FrontendArgs:
         self.security_group_ids = security_group_ids
         self.api_url = api_url
         self.alb_arn = alb_arn
+        self.bucket_name = bucket_name
+        self.log_retention_days = log_retention_days
+        self.log_max_buffer_size = log_max_buffer_size
+        self.log_router = log_router
+        self.deregistration_delay = deregistration_delay
+        self.health_check_grace_period_seconds = health_check_grace_period_seconds
+        self.deployment_minimum_healthy_percent = deployment_minimum_healthy_percent
+        self.deployment_maximum_percent = deployment_maximum_percent
+        self.deployment_controller = deployment_controller
+        self.traffic_shift = traffic_shift
+        self.test_listener_port = test_listener_port
+        self.desired_count = desired_count
 
 
 class Frontend(ComponentResource):
@@ -37,20 +62,28 @@ class Frontend(ComponentResource):
     ):
         super().__init__("custom:resource:Frontend", name, {}, opts)
 
+        blue_green = args.deployment_controller == "CODE_DEPLOY"
+
         # Create a Target Group
-        target_group = lb.TargetGroup(
-            f"{name}-tg",
+        target_group_args = dict(
             port=80,
             protocol="HTTP",
             target_type="ip",
             vpc_id=args.vpc_id,
+            deregistration_delay=args.deregistration_delay,
             health_check=lb.TargetGroupHealthCheckArgs(
+                path="/",
+                port=80,
                 healthy_threshold=2,
                 interval=5,
                 timeout=4,
                 protocol="HTTP",
                 matcher="200-399",
             ),
+        )
+        target_group = lb.TargetGroup(
+            f"{name}-tg",
+            **target_group_args,
             opts=ResourceOptions(parent=self),
         )
 
@@ -65,6 +98,42 @@ class Frontend(ComponentResource):
                     target_group_arn=target_group.arn,
                 )
             ],
+            opts=ResourceOptions(
+                parent=self,
+                ignore_changes=["defaultActions"] if blue_green else None,
+            ),
+        )
+        listeners = [listener]
+
+        # Blue/green deployments shift traffic to a second Target Group, which
+        # is reachable through the test listener before the cutover
+        if blue_green:
+            green_target_group = lb.TargetGroup(
+                f"{name}-tg-green",
+                **target_group_args,
+                opts=ResourceOptions(parent=self),
+            )
+            test_listener = lb.Listener(
+                f"{name}-test-listener",
+                load_balancer_arn=args.alb_arn,
+                port=args.test_listener_port,
+                default_actions=[
+                    lb.ListenerDefaultActionArgs(
+                        type="forward",
+                        target_group_arn=target_group.arn,
+                    )
+                ],
+                opts=ResourceOptions(parent=self, ignore_changes=["defaultActions"]),
+            )
+            listeners.append(test_listener)
+
+        # Create the log group for the Frontend task
+        task_logs = logs.TaskLogs(
+            f"{name}-task",
+            retention_in_days=args.log_retention_days,
+            max_buffer_size=args.log_max_buffer_size,
+            router=args.log_router,
+            bucket_name=args.bucket_name,
             opts=ResourceOptions(parent=self),
         )
 
@@ -92,15 +161,7 @@ class Frontend(ComponentResource):
                                 "protocol": "tcp",
                             }
                         ],
-                        "logConfiguration": {
-                            "logDriver": "awslogs",
-                            "options": {
-                                "awslogs-create-group": "true",
-                                "awslogs-group": f"/ecs/{name}-task",
-                                "awslogs-region": "eu-west-2",
-                                "awslogs-stream-prefix": "ecs",
-                            },
-                        },
+                        **task_logs.configuration(),
                         "environment": [
                             {
                                 "name": "APP_ENV",
@@ -117,6 +178,7 @@ class Frontend(ComponentResource):
                         ],
                     }
                 ]
+                + task_logs.sidecars()
             ),
             opts=ResourceOptions(parent=self),
         )
@@ -125,9 +187,23 @@ class Frontend(ComponentResource):
         self.service = ecs.Service(
             f"{name}-svc",
             cluster=args.cluster_arn,
-            desired_count=1,
+            desired_count=args.desired_count,
             launch_type="FARGATE",
             task_definition=self.task_definition.arn,
+            health_check_grace_period_seconds=args.health_check_grace_period_seconds,
+            deployment_minimum_healthy_percent=args.deployment_minimum_healthy_percent,
+            deployment_maximum_percent=args.deployment_maximum_percent,
+            deployment_controller=ecs.ServiceDeploymentControllerArgs(
+                type=args.deployment_controller,
+            ),
+            deployment_circuit_breaker=(
+                None
+                if blue_green
+                else ecs.ServiceDeploymentCircuitBreakerArgs(
+                    enable=True,
+                    rollback=True,
+                )
+            ),
             network_configuration=ecs.ServiceNetworkConfigurationArgs(
                 assign_public_ip=True,
                 subnets=args.subnet_ids,
@@ -140,7 +216,35 @@ class Frontend(ComponentResource):
                     container_port=80,
                 )
             ],
-            opts=ResourceOptions(depends_on=[listener], parent=self),
+            opts=ResourceOptions(
+                depends_on=listeners,
+                parent=self,
+                # CodeDeploy owns the running task definition and target group
+                ignore_changes=(
+                    ["taskDefinition", "loadBalancers"] if blue_green else None
+                ),
+            ),
         )
 
+        # Create the CodeDeploy deployment group for blue/green rollouts
+        self.blue_green = None
+        self.app_spec = None
+        if blue_green:
+            self.blue_green = bluegreen.BlueGreen(
+                f"{name}-bg",
+                bluegreen.BlueGreenArgs(
+                    cluster_arn=args.cluster_arn,
+                    service_name=self.service.name,
+                    prod_listener_arn=listener.arn,
+                    test_listener_arn=test_listener.arn,
+                    blue_target_group_name=target_group.name,
+                    green_target_group_name=green_target_group.name,
+                    traffic_shift=args.traffic_shift,
+                ),
+                opts=ResourceOptions(parent=self),
+            )
+            self.app_spec = self.blue_green.app_spec(
+                self.task_definition.arn, container_name, 80
+            )
+
         self.register_outputs({})
@@ -0,0 +1,345 @@
+"""
+The stack split into layers, which can run together as a single stack or as
+separate network, data and app stacks connected through StackReferences.
+
+Each layer returns the outputs later layers consume, under the same keys it
+exports when running as its own stack.
+
+Components and providers are imported by the layer, or the option, that
+constructs them, so a stack only pays the import time of what it deploys.
+"""
+
+import pulumi
+
+NETWORK_OUTPUTS = [
+    "vpc_id",
+    "subnet_ids",
+    "rds_security_group_id",
+    "redis_security_group_id",
+    "app_security_group_id",
+    "be_security_group_id",
+    "pdf_security_group_id",
+    "front_lb_arn",
+    "front_lb_arn_suffix",
+    "front_lb_dns_name",
+    "back_lb_arn",
+    "back_lb_arn_suffix",
+    "back_lb_dns_name",
+]
+
+DATA_OUTPUTS = [
+    "db_host",
+    "db_instance_id",
+    "db_name",
+    "db_user",
+    "db_password",
+    "redis_host",
+    "redis_cluster_id",
+]
+
+
+def get_int(config, key, default):
+    """
+    An integer config value, or its default when unset, so 0 can be set.
+    """
+    value = config.get_int(key)
+    return default if value is None else value
+
+
+def get_float(config, key, default):
+    """
+    A float config value, or its default when unset, so 0 can be set.
+    """
+    value = config.get_float(key)
+    return default if value is None else value
+
+
+def stack_outputs(stack_name, keys):
+    """
+    Outputs of another layer's stack, read through a StackReference.
+    """
+    reference = pulumi.StackReference(stack_name)
+    return {key: reference.get_output(key) for key in keys}
+
+
+def network_layer(config):
+    """
+    VPC, subnets, security groups, load balancers and their access logs.
+    """
+    import network
+
+    service_name = config.get("service_name") or "lago"
+    blue_green = config.get("deployment_controller") == "CODE_DEPLOY"
+    test_listener_port = get_int(config, "test_listener_port", 8080)
+
+    # Create the ALB access logs bucket and Athena table
+    access_logs_bucket = None
+    if config.get_bool("access_logs"):
+        import accesslogs
+
+        alb_logs = accesslogs.AccessLogs(
+            f"keel-{service_name}-alb-logs",
+            accesslogs.AccessLogsArgs(
+                database_name=f"{service_name}_alb_logs".replace("-", "_"),
+                expiration_days=get_int(config, "access_logs_retention_days", 30),
+            ),
+        )
+        access_logs_bucket = alb_logs.bucket_name
+
+    # Create an AWS VPC with Subnets and Security Groups
+    vpc = network.Vpc(
+        f"{service_name}-net",
+        network.VpcArgs(
+            test_listener_ports=[test_listener_port] if blue_green else None,
+            access_logs_bucket=access_logs_bucket,
+            availability_zones=config.get_object("availability_zones"),
+        ),
+    )
+    subnet_ids = []
+    for subnet in vpc.subnets:
+        subnet_ids.append(subnet.id)
+
+    return {
+        "vpc_id": vpc.vpc.id,
+        "subnet_ids": subnet_ids,
+        "rds_security_group_id": vpc.rds_security_group.id,
+        "redis_security_group_id": vpc.redis_security_group.id,
+        "app_security_group_id": vpc.app_security_group.id,
+        "be_security_group_id": vpc.be_security_group.id,
+        "pdf_security_group_id": vpc.pdf_security_group.id,
+        "front_lb_arn": vpc.front_lb.arn,
+        "front_lb_arn_suffix": vpc.front_lb.arn_suffix,
+        "front_lb_dns_name": vpc.front_lb.dns_name,
+        "back_lb_arn": vpc.back_lb.arn,
+        "back_lb_arn_suffix": vpc.back_lb.arn_suffix,
+        "back_lb_dns_name": vpc.back_lb.dns_name,
+    }
+
+
+def data_layer(config, net):
+    """
+    PostgreSQL RDS instance and ElastiCache Redis cluster.
+    """
+    import database
+
+    service_name = config.get("service_name") or "lago"
+    db_name = config.get("db_name") or "lago"
+    db_user = config.get("db_user") or "lago"
+
+    db_password = config.get_secret("db_password")
+    if not db_password:
+        import pulumi_random as random
+
+        password = random.RandomPassword(
+            "db_password",
+            length=16,
+        )
+        db_password = password.result
+
+    # Create an RDS PostgreSQL instance
+    db = database.Db(
+        f"{service_name}-db",
+        database.DbArgs(
+            db_name=db_name,
+            db_user=db_user,
+            db_password=db_password,
+            subnet_ids=net["subnet_ids"],
+            security_group_ids=[net["rds_security_group_id"]],
+            instance_class=config.get("db_instance_class") or "db.t4g.micro",
+            storage_type=config.get("db_storage_type") or "gp2",
+        ),
+    )
+
+    # Create a Elasticache Redis instance
+    redis = database.Redis(
+        f"{service_name}-redis",
+        database.RedisArgs(
+            redis_name=db_name,
+            subnet_ids=net["subnet_ids"],
+            security_group_ids=[net["redis_security_group_id"]],
+            node_type=config.get("redis_node_type") or "cache.t3.micro",
+        ),
+    )
+
+    return {
+        "db_host": db.db.address,
+        "db_instance_id": db.db.identifier,
+        "db_name": db_name,
+        "db_user": db_user,
+        "db_password": pulumi.Output.secret(db_password),
+        "redis_host": redis.redis.cache_nodes[0].address,
+        "redis_cluster_id": redis.redis.cluster_id,
+    }
+
+
+def app_layer(config, net, data):
+    """
+    ECS cluster, storage bucket, Lago services, monitoring and canaries.
+    """
+    import backend
+    import bucket
+    import cluster
+    import frontend
+    import monitoring
+    import pdf
+
+    service_name = config.get("service_name") or "lago"
+    lago_version = config.get("lago_version")
+    log_retention_days = get_int(config, "log_retention_days", 14)
+    log_max_buffer_size = config.get("log_max_buffer_size") or "25m"
+    log_router = config.get("log_router")
+    deployment_controller = config.get("deployment_controller") or "ECS"
+    traffic_shift = config.get("traffic_shift") or "linear"
+    test_listener_port = get_int(config, "test_listener_port", 8080)
+    blue_green = deployment_controller == "CODE_DEPLOY"
+    tracing_exporter = config.get("tracing_exporter")
+    alarm_topic_arn = config.get("alarm_topic_arn")
+    alarm_actions = [alarm_topic_arn] if alarm_topic_arn else []
+
+    # Create ECS Cluster
+    ecs_cluster = cluster.Cluster(
+        f"{service_name}-ecs",
+        cluster.ClusterArgs(
+            tracing=tracing_exporter == "xray",
+            container_insights=config.get_bool("container_insights") is not False,
+        ),
+    )
+
+    storage = bucket.Bucket(
+        f"keel-{service_name}-storage",
+        bucket.BucketArgs(role_name=ecs_cluster.role.name),
+    )
+
+    # Create the PDF renderer used for invoices
+    renderer = pdf.Pdf(
+        f"{service_name}-pdf",
+        pdf.PdfArgs(
+            cluster_arn=ecs_cluster.cluster.arn,
+            cluster_name=ecs_cluster.cluster.name,
+            role=ecs_cluster.role,
+            vpc_id=net["vpc_id"],
+            subnet_ids=net["subnet_ids"],
+            security_group_ids=[net["pdf_security_group_id"]],
+            min_count=get_int(config, "pdf_min_count", 1),
+            max_count=get_int(config, "pdf_max_count", 4),
+            log_retention_days=log_retention_days,
+            log_max_buffer_size=log_max_buffer_size,
+        ),
+    )
+
+    # Create Backend
+    back = backend.Backend(
+        f"{service_name}-be",
+        backend.BackendArgs(
+            cluster_arn=ecs_cluster.cluster.arn,
+            role=ecs_cluster.role,
+            lago_version=lago_version,
+            vpc_id=net["vpc_id"],
+            subnet_ids=net["subnet_ids"],
+            app_security_group=net["app_security_group_id"],
+            container_security_group=net["be_security_group_id"],
+            db_host=data["db_host"],
+            db_name=data["db_name"],
+            db_user=data["db_user"],
+            db_password=data["db_password"],
+            redis_host=data["redis_host"],
+            bucket_name=storage.bucket.bucket,
+            front_url=net["front_lb_dns_name"],
+            api_url=net["back_lb_dns_name"],
+            alb_arn=net["back_lb_arn"],
+            pdf_url=renderer.url,
+            log_retention_days=log_retention_days,
+            log_max_buffer_size=log_max_buffer_size,
+            log_router=log_router,
+            deployment_controller=deployment_controller,
+            traffic_shift=traffic_shift,
+            test_listener_port=test_listener_port,
+            api_desired_count=get_int(config, "api_desired_count", 1),
+            tracing_exporter=tracing_exporter,
+            tracing_endpoint=config.get("tracing_endpoint"),
+            tracing_sampling_ratio=get_float(config, "tracing_sampling_ratio", 0.1),
+        ),
+    )
+
+    # Create Frontend
+    front = frontend.Frontend(
+        f"{service_name}-front",
+        frontend.FrontendArgs(
+            cluster_arn=ecs_cluster.cluster.arn,
+            role=ecs_cluster.role,
+            lago_version=lago_version,
+            vpc_id=net["vpc_id"],
+            subnet_ids=net["subnet_ids"],
+            security_group_ids=[net["app_security_group_id"]],
+            api_url=net["back_lb_dns_name"],
+            alb_arn=net["front_lb_arn"],
+            bucket_name=storage.bucket.bucket,
+            log_retention_days=log_retention_days,
+            log_max_buffer_size=log_max_buffer_size,
+            log_router=log_router,
+            deployment_controller=deployment_controller,
+            traffic_shift=traffic_shift,
+            test_listener_port=test_listener_port,
+            desired_count=get_int(config, "front_desired_count", 1),
+        ),
+    )
+
+    # Create performance dashboards and alarms
+    dashboards = monitoring.Monitoring(
+        f"{service_name}-monitoring",
+        monitoring.MonitoringArgs(
+            cluster_name=ecs_cluster.cluster.name,
+            services={
+                "api": back.api_service.name,
+                "clock": back.clock_service.name,
+                "front": front.service.name,
+                "pdf": renderer.service.name,
+            },
+            front_alb_arn_suffix=net["front_lb_arn_suffix"],
+            back_alb_arn_suffix=net["back_lb_arn_suffix"],
+            db_instance_id=data["db_instance_id"],
+            redis_cluster_id=data["redis_cluster_id"],
+            latency_p99_threshold=get_float(config, "alarm_latency_p99", 1.0),
+            error_5xx_threshold=get_int(config, "alarm_5xx_count", 10),
+            cpu_threshold=get_int(config, "alarm_cpu_percent", 80),
+            memory_threshold=get_int(config, "alarm_memory_percent", 80),
+            db_cpu_threshold=get_int(config, "alarm_db_cpu_percent", 80),
+            redis_memory_threshold=get_int(config, "alarm_redis_memory_percent", 80),
+            alarm_actions=alarm_actions,
+        ),
+    )
+
+    front_url = pulumi.Output.concat("http://", net["front_lb_dns_name"])
+    api_url = pulumi.Output.concat("http://", net["back_lb_dns_name"])
+
+    # Create the synthetic latency canaries
+    if config.get_bool("canary"):
+        import synthetics
+
+        synthetics.Canary(
+            f"{service_name}-canary",
+            synthetics.CanaryArgs(
+                api_url=api_url,
+                front_url=front_url,
+                api_key=config.get_secret("canary_api_key"),
+                customer_id=config.get("canary_customer_id"),
+                metric_code=config.get("canary_metric_code"),
+                latency_threshold_ms=get_int(config, "canary_latency_ms", 1000),
+                alarm_actions=alarm_actions,
+            ),
+        )
+
+    outputs = {
+        "Lago Front URL": front_url,
+        "Lago API URL": api_url,
+        "ECS Cluster Name": ecs_cluster.cluster.name,
+        "Lago Version": lago_version,
+        "Service Name": service_name,
+        "Dashboard Name": dashboards.dashboard.dashboard_name,
+    }
+
+    if blue_green:
+        outputs["Lago API AppSpec"] = back.api_app_spec
+        outputs["Lago Front AppSpec"] = front.app_spec
+
+    return outputs
@@ -0,0 +1,544 @@
+"""
+Load-tests event ingestion on a deployed Lago API, through `/api/v1/events`
+or `/api/v1/events/batch`, and reports latency percentiles, throughput and
+errors as JSON.
+
+Against the stack's own API, reading its URL from the stack outputs and its
+API key from the stack's `loadtest_api_key` config, unless one is given:
+
+    python loadtest.py --stack prod --mode batch --batch-size 100 --concurrency 32 --rate 50 --duration 60
+
+against any URL, or against a local stub server to try the harness offline:
+
+    python loadtest.py --url http://localhost:3000 --api-key $LAGO_API_KEY --requests 1000
+    python loadtest.py --stub --duration 10
+
+Requests go out over a pool of keep-alive connections, at most `concurrency`
+at a time, paced to `rate` requests per second when a rate is given.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import random
+import ssl
+import sys
+import time
+import urllib.parse
+import uuid
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_NAME = "lago-pulumi"
+
+SINGLE = "single"
+BATCH = "batch"
+PATHS = {SINGLE: "/api/v1/events", BATCH: "/api/v1/events/batch"}
+
+# Lago rejects batches of more events
+MAX_BATCH_SIZE = 100
+
+
+class HttpError(Exception):
+    pass
+
+
+class Connection:
+    """
+    A keep-alive HTTP/1.1 connection.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    @classmethod
+    async def open(cls, host, port, tls=False):
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=ssl.create_default_context() if tls else None
+        )
+        return cls(reader, writer)
+
+    async def request(self, method, host, path, headers, body=b""):
+        """
+        Sends a request and returns its status and body.
+        """
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HttpError("connection closed")
+        status = int(status_line.split()[1])
+        response_headers = await read_headers(self.reader)
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            response_body = await read_chunked(self.reader)
+        else:
+            length = int(response_headers.get("content-length", 0))
+            response_body = await self.reader.readexactly(length)
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, response_body
+
+    def close(self):
+        self.closed = True
+        self.writer.close()
+
+
+async def read_headers(reader):
+    """
+    Headers of a request or response, by lowercase name.
+    """
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def read_chunked(reader):
+    body = b""
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        if size == 0:
+            await read_headers(reader)
+            return body
+        body += await reader.readexactly(size)
+        await reader.readline()
+
+
+class ConnectionPool:
+    """
+    Up to `size` keep-alive connections to the origin of a URL, opened as
+    needed and reused across requests.
+    """
+
+    def __init__(self, url, size, timeout=30.0):
+        parsed = urllib.parse.urlsplit(url)
+        self.tls = parsed.scheme == "https"
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if self.tls else 80)
+        self.base_path = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+        # Connections opened over the pool's lifetime
+        self.opened = 0
+
+    async def request(self, method, path, headers, body=b""):
+        async with self.slots:
+            connection = self.idle.pop() if self.idle else None
+            if connection is None:
+                connection = await asyncio.wait_for(
+                    Connection.open(self.host, self.port, self.tls), self.timeout
+                )
+                self.opened += 1
+            try:
+                result = await asyncio.wait_for(
+                    connection.request(
+                        method, self.host, self.base_path + path, headers, body
+                    ),
+                    self.timeout,
+                )
+            except BaseException:
+                connection.close()
+                raise
+            if not connection.closed:
+                self.idle.append(connection)
+            return result
+
+    def close(self):
+        for connection in self.idle:
+            connection.close()
+        self.idle = []
+
+
+class EventFactory:
+    """
+    Usage events spread over `customers` customers and `metrics` billable
+    metrics, so the load can match the cardinality of a real organization.
+    """
+
+    def __init__(self, customers=100, metrics=5, metric_codes=None, seed=None):
+        self.customer_ids = [f"loadtest-customer-{index}" for index in range(customers)]
+        self.metric_codes = metric_codes or [
+            f"loadtest-metric-{index}" for index in range(metrics)
+        ]
+        self.random = random.Random(seed)
+
+    def event(self):
+        return {
+            "transaction_id": str(uuid.uuid4()),
+            "external_customer_id": self.random.choice(self.customer_ids),
+            "code": self.random.choice(self.metric_codes),
+            "timestamp": int(time.time()),
+            "properties": {"value": self.random.randint(1, 100)},
+        }
+
+    def body(self, mode, batch_size=1):
+        if mode == BATCH:
+            return {"events": [self.event() for _ in range(batch_size)]}
+        return {"event": self.event()}
+
+
+class Result:
+
+    def __init__(self, latency_ms, status=None, error=None):
+        self.latency_ms = latency_ms
+        # HTTP status, None when the request failed without a response
+        self.status = status
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status is not None and 200 <= self.status < 300
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class LoadTest:
+    """
+    Sends ingestion requests until `duration` seconds have passed or
+    `requests` requests were sent, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        url,
+        api_key=None,
+        mode=SINGLE,
+        batch_size=1,
+        concurrency=10,
+        rate=None,
+        duration=None,
+        requests=None,
+        events=None,
+        timeout=30.0,
+    ):
+        if mode not in PATHS:
+            raise ValueError(f"Unsupported mode '{mode}', expected 'single' or 'batch'")
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+        if duration is None and requests is None:
+            raise ValueError("Give a duration, a number of requests, or both")
+
+        self.url = url
+        self.api_key = api_key
+        self.mode = mode
+        self.batch_size = batch_size if mode == BATCH else 1
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.requests = requests
+        self.events = events or EventFactory()
+        self.timeout = timeout
+        self.results = []
+        self.sent = 0
+
+    def _next_slot(self, started):
+        """
+        Claims the next request and returns when to send it, or None once
+        the test is over.
+        """
+        if self.requests is not None and self.sent >= self.requests:
+            return None
+        if self.rate:
+            offset = self.sent / self.rate
+        else:
+            offset = time.perf_counter() - started
+        if self.duration is not None and offset >= self.duration:
+            return None
+        self.sent += 1
+        return started + offset
+
+    async def _worker(self, pool, started):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        while (slot := self._next_slot(started)) is not None:
+            await asyncio.sleep(slot - time.perf_counter())
+            body = json.dumps(self.events.body(self.mode, self.batch_size)).encode()
+
+            sent = time.perf_counter()
+            try:
+                status, _ = await pool.request("POST", PATHS[self.mode], headers, body)
+                result = Result(0.0, status=status)
+            except asyncio.TimeoutError:
+                result = Result(0.0, error="timeout")
+            except (OSError, HttpError, asyncio.IncompleteReadError, ValueError):
+                result = Result(0.0, error="connection")
+            result.latency_ms = (time.perf_counter() - sent) * 1000
+            self.results.append(result)
+
+    async def run(self):
+        """
+        Runs the load test and returns its report.
+        """
+        pool = ConnectionPool(self.url, self.concurrency, self.timeout)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(
+                *(self._worker(pool, started) for _ in range(self.concurrency))
+            )
+        finally:
+            pool.close()
+        elapsed = time.perf_counter() - started
+        return self.report(elapsed, pool.opened)
+
+    def report(self, elapsed, connections):
+        succeeded = [result for result in self.results if result.ok]
+        # Latency of every request answered, whatever its status
+        latencies = sorted(
+            result.latency_ms for result in self.results if result.status is not None
+        )
+        errors = collections.Counter(
+            str(result.status) if result.status is not None else result.error
+            for result in self.results
+            if not result.ok
+        )
+
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+
+        return {
+            "target": self.url,
+            "mode": self.mode,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "target_rate": self.rate,
+            "customers": len(self.events.customer_ids),
+            "metrics": len(self.events.metric_codes),
+            "duration_seconds": round(elapsed, 3),
+            "connections": connections,
+            "requests": len(self.results),
+            "succeeded": len(succeeded),
+            "failed": len(self.results) - len(succeeded),
+            "events": len(succeeded) * self.batch_size,
+            "throughput": {
+                "requests_per_second": round(len(self.results) / elapsed, 2),
+                "events_per_second": round(
+                    len(succeeded) * self.batch_size / elapsed, 2
+                ),
+            },
+            "latency_ms": {
+                "p50": rounded(percentile(latencies, 0.50)),
+                "p95": rounded(percentile(latencies, 0.95)),
+                "p99": rounded(percentile(latencies, 0.99)),
+                "max": rounded(latencies[-1] if latencies else None),
+                "mean": rounded(sum(latencies) / len(latencies) if latencies else None),
+            },
+            "errors": dict(sorted(errors.items())),
+        }
+
+
+class StubServer:
+    """
+    Local stand-in for the Lago ingestion endpoints, answering over HTTP/1.1
+    keep-alive after `latency` seconds, failing `error_rate` of the requests
+    with a 500, and rejecting other API keys than `api_key` when given.
+    """
+
+    def __init__(
+        self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, api_key=None
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.api_key = api_key
+        self.server = None
+        # Handlers of the open connections, to close them with the server
+        self.handlers = {}
+        self.connections = 0
+        self.requests = 0
+        self.events = []
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        for writer in self.handlers.values():
+            writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        handler = asyncio.current_task()
+        self.handlers[handler] = writer
+        try:
+            while request_line := await reader.readline():
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = await read_headers(reader)
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, response = self.handle(method, path, headers, body)
+                payload = json.dumps(response).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} Stub\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self.handlers[handler]
+            writer.close()
+
+    def handle(self, method, path, headers, body):
+        """
+        Status and JSON response of a request.
+        """
+        if method != "POST" or path not in PATHS.values():
+            return 404, {"status": 404, "error": "Not Found"}
+        if self.api_key and headers.get("authorization") != f"Bearer {self.api_key}":
+            return 401, {"status": 401, "error": "Unauthorized"}
+        if self.error_rate and random.random() < self.error_rate:
+            return 500, {"status": 500, "error": "Internal Server Error"}
+
+        try:
+            payload = json.loads(body)
+            events = payload["events"] if path == PATHS[BATCH] else [payload["event"]]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"status": 400, "error": "BadRequest"}
+        invalid = (
+            not events
+            or len(events) > MAX_BATCH_SIZE
+            or any(
+                not event.get("transaction_id")
+                or not event.get("external_customer_id")
+                or not event.get("code")
+                for event in events
+            )
+        )
+        if invalid:
+            return 422, {"status": 422, "error": "Unprocessable Entity"}
+
+        self.events.extend(events)
+        if path == PATHS[BATCH]:
+            return 200, {"events": events}
+        return 200, {"event": events[0]}
+
+
+def stack_target(stack_name):
+    """
+    URL of the Lago API deployed by a stack of this project, and the API key
+    set for load tests in its config, if any. The key is kept apart from the
+    canary's, so load tests never ingest events into the canary's org.
+    """
+    from pulumi import automation as auto
+
+    stack = auto.select_stack(stack_name=stack_name, work_dir=PROJECT_DIR)
+    outputs = stack.outputs()
+    if "Lago API URL" not in outputs:
+        raise ValueError(f"Stack '{stack_name}' does not export a 'Lago API URL'")
+    api_key = stack.get_all_config().get(f"{PROJECT_NAME}:loadtest_api_key")
+    return outputs["Lago API URL"].value, api_key.value if api_key else None
+
+
+async def run_with_stub(load_test, **stub_options):
+    async with StubServer(**stub_options) as stub:
+        load_test.url = stub.url
+        return await load_test.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of the Lago API")
+    target.add_argument("--stack", help="read the URL and API key from this stack")
+    target.add_argument("--stub", action="store_true", help="run a local stub server")
+    parser.add_argument("--api-key", default=os.environ.get("LAGO_API_KEY"))
+    parser.add_argument("--mode", choices=[SINGLE, BATCH], default=SINGLE)
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, help="requests per second")
+    parser.add_argument("--duration", type=float, help="seconds to run for")
+    parser.add_argument("--requests", type=int, help="requests to send")
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--metrics", type=int, default=5)
+    parser.add_argument(
+        "--metric-code",
+        action="append",
+        help="existing billable metric codes to send events for",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--stub-latency", type=float, default=0.0)
+    parser.add_argument("--output", help="also write the report to this file")
+    cli_args = parser.parse_args()
+
+    url, api_key = cli_args.url, cli_args.api_key
+    if cli_args.stack:
+        url, stack_api_key = stack_target(cli_args.stack)
+        api_key = api_key or stack_api_key
+
+    try:
+        load_test = LoadTest(
+            url,
+            api_key,
+            mode=cli_args.mode,
+            batch_size=cli_args.batch_size,
+            concurrency=cli_args.concurrency,
+            rate=cli_args.rate,
+            duration=cli_args.duration,
+            requests=cli_args.requests,
+            events=EventFactory(
+                cli_args.customers, cli_args.metrics, cli_args.metric_code
+            ),
+            timeout=cli_args.timeout,
+        )
+    except ValueError as error:
+        parser.error(str(error))
+
+    if cli_args.stub:
+        report = asyncio.run(
+            run_with_stub(load_test, latency=cli_args.stub_latency, api_key=api_key)
+        )
+    else:
+        report = asyncio.run(load_test.run())
+
+    if cli_args.output:
+        with open(cli_args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+            output_file.write("\n")
+    print(json.dumps(report, indent=2))
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
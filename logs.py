@@ -0,0 +1,117 @@
+from pulumi import ResourceOptions
+from pulumi_aws import cloudwatch, config
+
+# AWS for Fluent Bit image used as the FireLens log router, pinned so task
+# starts are reproducible
+FLUENT_BIT_IMAGE = "public.ecr.aws/aws-observability/aws-for-fluent-bit:2.32.2"
+
+LOG_ROUTER_CONTAINER_NAME = "log_router"
+
+
+class TaskLogs:
+    """
+    CloudWatch log group and container log settings for one task definition.
+
+    The log group is created up front with a retention policy, so tasks never
+    call CreateLogGroup on start. Containers log with the awslogs driver in
+    non-blocking mode, or through an optional FireLens (Fluent Bit) sidecar
+    that batches logs to CloudWatch or compresses them to S3.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        retention_in_days=14,
+        max_buffer_size="25m",
+        router=None,
+        bucket_name=None,
+        opts: ResourceOptions = None,
+    ):
+        if router not in (None, "cloudwatch", "s3"):
+            raise ValueError(
+                f"Unsupported log router '{router}', expected 'cloudwatch' or 's3'"
+            )
+        if router == "s3" and bucket_name is None:
+            raise ValueError("The 's3' log router requires a bucket name")
+
+        self.name = name
+        self.max_buffer_size = max_buffer_size
+        self.router = router
+        self.bucket_name = bucket_name
+
+        self.log_group = cloudwatch.LogGroup(
+            f"{name}-logs",
+            name=f"/ecs/{name}",
+            retention_in_days=retention_in_days,
+            opts=opts,
+        )
+
+    def awslogs(self, stream_prefix="ecs"):
+        """
+        Non-blocking awslogs configuration writing to the task log group.
+        """
+        return {
+            "logDriver": "awslogs",
+            "options": {
+                "awslogs-group": self.log_group.name,
+                "awslogs-region": config.region,
+                "awslogs-stream-prefix": stream_prefix,
+                "mode": "non-blocking",
+                "max-buffer-size": self.max_buffer_size,
+            },
+        }
+
+    def configuration(self, stream_prefix="ecs"):
+        """
+        Log settings for an application container of the task.
+        """
+        if self.router is None:
+            return {"logConfiguration": self.awslogs(stream_prefix)}
+
+        if self.router == "cloudwatch":
+            options = {
+                "Name": "cloudwatch_logs",
+                "region": config.region,
+                "log_group_name": self.log_group.name,
+                "log_stream_prefix": f"{stream_prefix}/",
+                "auto_create_group": "false",
+            }
+        else:
+            options = {
+                "Name": "s3",
+                "region": config.region,
+                "bucket": self.bucket_name,
+                "total_file_size": "50M",
+                "upload_timeout": "1m",
+                "use_put_object": "On",
+                "compression": "gzip",
+                "s3_key_format": f"/logs/{self.name}/%Y/%m/%d/{stream_prefix}/$UUID.gz",
+            }
+
+        return {
+            "logConfiguration": {"logDriver": "awsfirelens", "options": options},
+            "dependsOn": [
+                {"containerName": LOG_ROUTER_CONTAINER_NAME, "condition": "START"}
+            ],
+        }
+
+    def sidecars(self):
+        """
+        Extra container definitions required by the log configuration.
+        """
+        if self.router is None:
+            return []
+
+        return [
+            {
+                "name": LOG_ROUTER_CONTAINER_NAME,
+                "image": FLUENT_BIT_IMAGE,
+                "essential": True,
+                "memoryReservation": 50,
+                "firelensConfiguration": {
+                    "type": "fluentbit",
+                    "options": {"enable-ecs-log-metadata": "true"},
+                },
+                "logConfiguration": self.awslogs("firelens"),
+            }
+        ]
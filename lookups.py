@@ -0,0 +1,67 @@
+"""
+Provider lookups shared by the components.
+
+Each lookup is invoked at most once per stack and run. Lookups whose results
+only feed resource inputs are exposed as Outputs from the non-blocking invoke
+variants, so resource registration carries on while they resolve.
+"""
+
+import functools
+
+import pulumi
+from pulumi_aws import (
+    elb,
+    get_availability_zones,
+    get_caller_identity_output,
+)
+
+
+def per_stack(lookup):
+    """
+    Memoizes a lookup per stack, as one process may run several stacks at
+    once, e.g. the fleet orchestrator.
+    """
+    cached = functools.cache(lambda stack: lookup())
+
+    @functools.wraps(lookup)
+    def memoized():
+        return cached(pulumi.get_stack())
+
+    memoized.cache_clear = cached.cache_clear
+    return memoized
+
+
+@per_stack
+def caller_identity():
+    """
+    Account, ARN and user of the deploying credentials, as an Output.
+    """
+    return get_caller_identity_output()
+
+
+@per_stack
+def elb_service_account():
+    """
+    Elastic Load Balancing account of the region, as an Output.
+    """
+    return elb.get_service_account_output()
+
+
+@per_stack
+def availability_zone_names():
+    """
+    Names of the availability zones of the region.
+
+    This one blocks: the zone names are part of the subnet resource names,
+    which must be known when the subnets are registered.
+    """
+    return get_availability_zones().names
+
+
+def reset():
+    """
+    Forgets all memoized lookups, e.g. between runs sharing one process.
+    """
+    caller_identity.cache_clear()
+    elb_service_account.cache_clear()
+    availability_zone_names.cache_clear()
@@ -0,0 +1,294 @@
+from pulumi import ComponentResource, Output, ResourceOptions
+from pulumi_aws import cloudwatch, config
+
+
+class MonitoringArgs:
+
+    def __init__(
+        self,
+        cluster_name=None,
+        services={},
+        front_alb_arn_suffix=None,
+        back_alb_arn_suffix=None,
+        db_instance_id=None,
+        redis_cluster_id=None,
+        latency_p99_threshold=1.0,
+        error_5xx_threshold=10,
+        cpu_threshold=80,
+        memory_threshold=80,
+        db_cpu_threshold=80,
+        redis_memory_threshold=80,
+        alarm_actions=[],
+    ):
+        self.cluster_name = cluster_name
+        # Mapping of a display name to an ECS service name
+        self.services = services
+        self.front_alb_arn_suffix = front_alb_arn_suffix
+        self.back_alb_arn_suffix = back_alb_arn_suffix
+        self.db_instance_id = db_instance_id
+        self.redis_cluster_id = redis_cluster_id
+        self.latency_p99_threshold = latency_p99_threshold
+        self.error_5xx_threshold = error_5xx_threshold
+        self.cpu_threshold = cpu_threshold
+        self.memory_threshold = memory_threshold
+        self.db_cpu_threshold = db_cpu_threshold
+        self.redis_memory_threshold = redis_memory_threshold
+        self.alarm_actions = alarm_actions
+
+
+def metric_widget(title, metrics, stat="Average", period=60):
+    """
+    CloudWatch dashboard widget graphing the given metric rows.
+    """
+    return {
+        "type": "metric",
+        "width": 12,
+        "height": 6,
+        "properties": {
+            "title": title,
+            "region": config.region,
+            "view": "timeSeries",
+            "stat": stat,
+            "period": period,
+            "metrics": metrics,
+        },
+    }
+
+
+class Monitoring(ComponentResource):
+
+    def __init__(
+        self,
+        name: str,
+        args: MonitoringArgs,
+        opts: ResourceOptions = None,
+    ):
+        super().__init__("custom:resource:Monitoring", name, {}, opts)
+
+        albs = {
+            "API": args.back_alb_arn_suffix,
+            "Front": args.front_alb_arn_suffix,
+        }
+
+        widgets = [
+            metric_widget(
+                "ALB target response time",
+                [
+                    [
+                        "AWS/ApplicationELB",
+                        "TargetResponseTime",
+                        "LoadBalancer",
+                        alb,
+                        {"stat": stat, "label": f"{label} {stat}"},
+                    ]
+                    for label, alb in albs.items()
+                    for stat in ("p50", "p95", "p99")
+                ],
+            ),
+            metric_widget(
+                "ALB 5xx errors",
+                [
+                    ["AWS/ApplicationELB", metric, "LoadBalancer", alb]
+                    for alb in albs.values()
+                    for metric in (
+                        "HTTPCode_Target_5XX_Count",
+                        "HTTPCode_ELB_5XX_Count",
+                    )
+                ],
+                stat="Sum",
+            ),
+            metric_widget(
+                "ECS CPU utilization",
+                [
+                    [
+                        "AWS/ECS",
+                        "CPUUtilization",
+                        "ClusterName",
+                        args.cluster_name,
+                        "ServiceName",
+                        service,
+                        {"label": label},
+                    ]
+                    for label, service in args.services.items()
+                ],
+            ),
+            metric_widget(
+                "ECS memory utilization",
+                [
+                    [
+                        "AWS/ECS",
+                        "MemoryUtilization",
+                        "ClusterName",
+                        args.cluster_name,
+                        "ServiceName",
+                        service,
+                        {"label": label},
+                    ]
+                    for label, service in args.services.items()
+                ],
+            ),
+            metric_widget(
+                "RDS CPU and connections",
+                [
+                    [
+                        "AWS/RDS",
+                        "CPUUtilization",
+                        "DBInstanceIdentifier",
+                        args.db_instance_id,
+                    ],
+                    [
+                        "AWS/RDS",
+                        "DatabaseConnections",
+                        "DBInstanceIdentifier",
+                        args.db_instance_id,
+                        {"yAxis": "right"},
+                    ],
+                ],
+            ),
+            metric_widget(
+                "RDS IOPS and replica lag",
+                [
+                    [
+                        "AWS/RDS",
+                        "ReadIOPS",
+                        "DBInstanceIdentifier",
+                        args.db_instance_id,
+                    ],
+                    [
+                        "AWS/RDS",
+                        "WriteIOPS",
+                        "DBInstanceIdentifier",
+                        args.db_instance_id,
+                    ],
+                    [
+                        "AWS/RDS",
+                        "ReplicaLag",
+                        "DBInstanceIdentifier",
+                        args.db_instance_id,
+                        {"yAxis": "right"},
+                    ],
+                ],
+            ),
+            metric_widget(
+                "Redis CPU and memory",
+                [
+                    ["AWS/ElastiCache", metric, "CacheClusterId", args.redis_cluster_id]
+                    for metric in (
+                        "CPUUtilization",
+                        "EngineCPUUtilization",
+                        "DatabaseMemoryUsagePercentage",
+                    )
+                ],
+            ),
+            metric_widget(
+                "Redis evictions",
+                [
+                    [
+                        "AWS/ElastiCache",
+                        "Evictions",
+                        "CacheClusterId",
+                        args.redis_cluster_id,
+                    ]
+                ],
+                stat="Sum",
+            ),
+        ]
+
+        self.dashboard = cloudwatch.Dashboard(
+            f"{name}-dashboard",
+            dashboard_name=name,
+            dashboard_body=Output.json_dumps({"widgets": widgets}),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Alarms on SLO breaches
+        alarm_options = dict(
+            alarm_actions=args.alarm_actions,
+            ok_actions=args.alarm_actions,
+            treat_missing_data="notBreaching",
+            opts=ResourceOptions(parent=self),
+        )
+
+        self.alarms = [
+            cloudwatch.MetricAlarm(
+                f"{name}-api-latency-p99",
+                alarm_description="API p99 target response time above the SLO",
+                namespace="AWS/ApplicationELB",
+                metric_name="TargetResponseTime",
+                dimensions={"LoadBalancer": args.back_alb_arn_suffix},
+                extended_statistic="p99",
+                period=60,
+                evaluation_periods=5,
+                datapoints_to_alarm=3,
+                threshold=args.latency_p99_threshold,
+                comparison_operator="GreaterThanThreshold",
+                **alarm_options,
+            ),
+            cloudwatch.MetricAlarm(
+                f"{name}-api-5xx",
+                alarm_description="API target 5xx responses above the SLO",
+                namespace="AWS/ApplicationELB",
+                metric_name="HTTPCode_Target_5XX_Count",
+                dimensions={"LoadBalancer": args.back_alb_arn_suffix},
+                statistic="Sum",
+                period=60,
+                evaluation_periods=5,
+                datapoints_to_alarm=3,
+                threshold=args.error_5xx_threshold,
+                comparison_operator="GreaterThanThreshold",
+                **alarm_options,
+            ),
+            cloudwatch.MetricAlarm(
+                f"{name}-db-cpu",
+                alarm_description="RDS CPU utilization high",
+                namespace="AWS/RDS",
+                metric_name="CPUUtilization",
+                dimensions={"DBInstanceIdentifier": args.db_instance_id},
+                statistic="Average",
+                period=300,
+                evaluation_periods=3,
+                threshold=args.db_cpu_threshold,
+                comparison_operator="GreaterThanThreshold",
+                **alarm_options,
+            ),
+            cloudwatch.MetricAlarm(
+                f"{name}-redis-memory",
+                alarm_description="Redis memory usage high",
+                namespace="AWS/ElastiCache",
+                metric_name="DatabaseMemoryUsagePercentage",
+                dimensions={"CacheClusterId": args.redis_cluster_id},
+                statistic="Average",
+                period=300,
+                evaluation_periods=3,
+                threshold=args.redis_memory_threshold,
+                comparison_operator="GreaterThanThreshold",
+                **alarm_options,
+            ),
+        ]
+
+        for label, service in args.services.items():
+            for metric, threshold in (
+                ("CPUUtilization", args.cpu_threshold),
+                ("MemoryUtilization", args.memory_threshold),
+            ):
+                self.alarms.append(
+                    cloudwatch.MetricAlarm(
+                        f"{name}-{label}-{metric.lower()}",
+                        alarm_description=f"{label} service {metric} high",
+                        namespace="AWS/ECS",
+                        metric_name=metric,
+                        dimensions={
+                            "ClusterName": args.cluster_name,
+                            "ServiceName": service,
+                        },
+                        statistic="Average",
+                        period=60,
+                        evaluation_periods=5,
+                        datapoints_to_alarm=3,
+                        threshold=threshold,
+                        comparison_operator="GreaterThanThreshold",
+                        **alarm_options,
+                    )
+                )
+
+        self.register_outputs({})
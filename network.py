@@ -1,5 +1,7 @@
+import lookups
+
 from pulumi import ComponentResource, ResourceOptions
-from pulumi_aws import ec2, get_availability_zones, lb
+from pulumi_aws import ec2, lb
 
 # VPC
 
@@ -12,11 +14,18 @@ class VpcArgs:
         instance_tenancy="default",
         enable_dns_hostnames=True,
         enable_dns_support=True,
+        test_listener_ports=None,
+        access_logs_bucket=None,
+        availability_zones=None,
     ):
         self.cidr_block = cidr_block
         self.instance_tenancy = instance_tenancy
         self.enable_dns_hostnames = enable_dns_hostnames
         self.enable_dns_support = enable_dns_support
+        self.test_listener_ports = test_listener_ports or []
+        self.access_logs_bucket = access_logs_bucket
+        # Zone names to use; looked up from the provider when not given
+        self.availability_zones = availability_zones
 
 
 class Vpc(ComponentResource):
@@ -69,8 +78,8 @@ class Vpc(ComponentResource):
 
         # Subnets
 
-        all_zones = get_availability_zones()
-        zone_names = [all_zones.names[0], all_zones.names[1], all_zones.names[2]]
+        all_zones = args.availability_zones or lookups.availability_zone_names()
+        zone_names = [all_zones[0], all_zones[1], all_zones[2]]
         self.subnets = []
         subnet_base_name = f"{name}-subnet"
 
@@ -188,6 +197,19 @@ class Vpc(ComponentResource):
                     protocol="tcp",
                     description="Allow http access.",
                 ),
+            ]
+            + [
+                # Blue/green test listeners are only reachable from the VPC
+                ec2.SecurityGroupIngressArgs(
+                    cidr_blocks=[
+                        args.cidr_block,
+                    ],
+                    from_port=port,
+                    to_port=port,
+                    protocol="tcp",
+                    description="Allow test listener access.",
+                )
+                for port in args.test_listener_ports
             ],
             egress=[
                 ec2.SecurityGroupEgressArgs(
@@ -235,16 +257,60 @@ class Vpc(ComponentResource):
             opts=ResourceOptions(parent=self),
         )
 
+        # Security group of the PDF renderer, which fetches any URL it is
+        # handed, so only the API may reach it
+        pdf_sg_name = f"{name}-pdf-sg"
+        self.pdf_security_group = ec2.SecurityGroup(
+            pdf_sg_name,
+            vpc_id=self.vpc.id,
+            description="Allow PDF rendering requests from the API.",
+            tags={
+                "Name": pdf_sg_name,
+            },
+            ingress=[
+                ec2.SecurityGroupIngressArgs(
+                    security_groups=[
+                        self.be_security_group.id,
+                    ],
+                    from_port=3000,
+                    to_port=3000,
+                    protocol="tcp",
+                    description="Allow API access.",
+                ),
+            ],
+            egress=[
+                ec2.SecurityGroupEgressArgs(
+                    protocol="-1",
+                    from_port=0,
+                    to_port=0,
+                    cidr_blocks=[
+                        "0.0.0.0/0",
+                    ],
+                ),
+            ],
+            opts=ResourceOptions(parent=self),
+        )
+
         subnet_ids = []
         for subnet in self.subnets:
             subnet_ids.append(subnet.id)
 
         # Create Load Balancers
 
+        def access_logs(prefix):
+            if args.access_logs_bucket is None:
+                return None
+            return lb.LoadBalancerAccessLogsArgs(
+                bucket=args.access_logs_bucket,
+                prefix=prefix,
+                enabled=True,
+            )
+
         self.front_lb = lb.LoadBalancer(
             f"{name}-front-alb",
             security_groups=[self.app_security_group.id],
             subnets=subnet_ids,
+            access_logs=access_logs("front"),
             opts=ResourceOptions(parent=self),
         )
 
@@ -252,6 +318,7 @@ class Vpc(ComponentResource):
             f"{name}-back-alb",
             security_groups=[self.app_security_group.id],
             subnets=subnet_ids,
+            access_logs=access_logs("api"),
             opts=ResourceOptions(parent=self),
         )
 
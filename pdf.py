@@ -0,0 +1,206 @@
+import logs
+
+from pulumi import ComponentResource, Output, ResourceOptions
+from pulumi_aws import appautoscaling, ecs, servicediscovery
+
+
+class PdfArgs:
+
+    def __init__(
+        self,
+        cluster_arn=None,
+        cluster_name=None,
+        role={},
+        vpc_id=None,
+        subnet_ids=None,
+        security_group_ids=None,
+        image="getlago/lago-gotenberg:8",
+        cpu="1024",
+        memory="2048",
+        ephemeral_storage_gib=30,
+        min_count=1,
+        max_count=4,
+        cpu_target=60,
+        namespace_name="lago.local",
+        discovery_name="pdf",
+        log_retention_days=14,
+        log_max_buffer_size="25m",
+    ):
+        self.cluster_arn = cluster_arn
+        self.cluster_name = cluster_name
+        self.role = role
+        self.vpc_id = vpc_id
+        self.subnet_ids = subnet_ids
+        self.security_group_ids = security_group_ids
+        self.image = image
+        self.cpu = cpu
+        self.memory = memory
+        self.ephemeral_storage_gib = ephemeral_storage_gib
+        self.min_count = min_count
+        self.max_count = max_count
+        self.cpu_target = cpu_target
+        self.namespace_name = namespace_name
+        self.discovery_name = discovery_name
+        self.log_retention_days = log_retention_days
+        self.log_max_buffer_size = log_max_buffer_size
+
+
+class Pdf(ComponentResource):
+
+    def __init__(
+        self,
+        name: str,
+        args: PdfArgs,
+        opts: ResourceOptions = None,
+    ):
+        super().__init__("custom:resource:Pdf", name, {}, opts)
+
+        # Create a private DNS namespace so the API can reach the renderer
+        self.namespace = servicediscovery.PrivateDnsNamespace(
+            f"{name}-ns",
+            name=args.namespace_name,
+            vpc=args.vpc_id,
+            opts=ResourceOptions(parent=self),
+        )
+
+        self.discovery_service = servicediscovery.Service(
+            f"{name}-sd",
+            name=args.discovery_name,
+            dns_config=servicediscovery.ServiceDnsConfigArgs(
+                namespace_id=self.namespace.id,
+                routing_policy="MULTIVALUE",
+                dns_records=[
+                    servicediscovery.ServiceDnsConfigDnsRecordArgs(
+                        ttl=10,
+                        type="A",
+                    )
+                ],
+            ),
+            health_check_custom_config=servicediscovery.ServiceHealthCheckCustomConfigArgs(
+                failure_threshold=1,
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        task_logs = logs.TaskLogs(
+            f"{name}-task",
+            retention_in_days=args.log_retention_days,
+            max_buffer_size=args.log_max_buffer_size,
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Create the PDF renderer ECS Task Definition
+        task_name = f"{name}-task"
+        container_name = f"{name}-container"
+        self.task_definition = ecs.TaskDefinition(
+            task_name,
+            family=task_name,
+            cpu=args.cpu,
+            memory=args.memory,
+            network_mode="awsvpc",
+            requires_compatibilities=["FARGATE"],
+            execution_role_arn=args.role.arn,
+            task_role_arn=args.role.arn,
+            ephemeral_storage=ecs.TaskDefinitionEphemeralStorageArgs(
+                size_in_gib=args.ephemeral_storage_gib,
+            ),
+            container_definitions=Output.json_dumps(
+                [
+                    {
+                        "name": container_name,
+                        "image": args.image,
+                        "portMappings": [
+                            {
+                                "containerPort": 3000,
+                                "hostPort": 3000,
+                                "protocol": "tcp",
+                            }
+                        ],
+                        "healthCheck": {
+                            "command": [
+                                "CMD-SHELL",
+                                "curl -f http://localhost:3000/health || exit 1",
+                            ],
+                            "interval": 10,
+                            "timeout": 5,
+                            "retries": 3,
+                            "startPeriod": 10,
+                        },
+                        **task_logs.configuration(),
+                    }
+                ]
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Create the PDF renderer ECS Service. Creation waits until the tasks
+        # pass their health check, so dependents only start once it serves.
+        self.service = ecs.Service(
+            f"{name}-svc",
+            cluster=args.cluster_arn,
+            desired_count=args.min_count,
+            launch_type="FARGATE",
+            task_definition=self.task_definition.arn,
+            deployment_minimum_healthy_percent=100,
+            deployment_maximum_percent=200,
+            deployment_circuit_breaker=ecs.ServiceDeploymentCircuitBreakerArgs(
+                enable=True,
+                rollback=True,
+            ),
+            # The public IP only serves pulling the image, as the subnets have
+            # no NAT gateway; the security group admits no inbound traffic
+            # from outside the API
+            network_configuration=ecs.ServiceNetworkConfigurationArgs(
+                assign_public_ip=True,
+                subnets=args.subnet_ids,
+                security_groups=args.security_group_ids,
+            ),
+            service_registries=ecs.ServiceServiceRegistriesArgs(
+                registry_arn=self.discovery_service.arn,
+                container_name=container_name,
+            ),
+            wait_for_steady_state=True,
+            opts=ResourceOptions(
+                parent=self,
+                # The desired count is owned by the autoscaling policy
+                ignore_changes=["desiredCount"],
+            ),
+        )
+
+        # Scale the renderer on CPU, as billing periods start in bursts
+        self.scaling_target = appautoscaling.Target(
+            f"{name}-scaling-target",
+            service_namespace="ecs",
+            scalable_dimension="ecs:service:DesiredCount",
+            resource_id=Output.concat(
+                "service/", args.cluster_name, "/", self.service.name
+            ),
+            min_capacity=args.min_count,
+            max_capacity=args.max_count,
+            opts=ResourceOptions(parent=self),
+        )
+
+        appautoscaling.Policy(
+            f"{name}-scaling-policy",
+            policy_type="TargetTrackingScaling",
+            service_namespace=self.scaling_target.service_namespace,
+            scalable_dimension=self.scaling_target.scalable_dimension,
+            resource_id=self.scaling_target.resource_id,
+            target_tracking_scaling_policy_configuration=appautoscaling.PolicyTargetTrackingScalingPolicyConfigurationArgs(
+                target_value=args.cpu_target,
+                predefined_metric_specification=appautoscaling.PolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecificationArgs(
+                    predefined_metric_type="ECSServiceAverageCPUUtilization",
+                ),
+                scale_out_cooldown=30,
+                scale_in_cooldown=300,
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Internal URL of the renderer. It resolves once the ECS service is
+        # steady, so anything consuming it starts after the renderer is healthy.
+        self.url = Output.all(
+            self.service.id, self.discovery_service.name, self.namespace.name
+        ).apply(lambda values: f"http://{values[1]}.{values[2]}:3000")
+
+        self.register_outputs({})
@@ -0,0 +1,17 @@
+"""
+CrossGuard policy pack flagging performance anti-patterns in the stack.
+
+    pulumi preview --policy-pack policy --policy-pack-config policy/tiers/prod.json
+
+Without a tier file every policy is advisory.
+"""
+
+import performance
+
+from pulumi_policy import EnforcementLevel, PolicyPack
+
+PolicyPack(
+    name="lago-performance",
+    enforcement_level=EnforcementLevel.ADVISORY,
+    policies=performance.POLICIES,
+)
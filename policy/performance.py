@@ -0,0 +1,209 @@
+"""
+Policies flagging the configuration that usually causes performance
+regressions in the stack: slow storage, burstable instances, single-task
+services, blocking logging and slow deployments.
+
+Each policy takes a `tier` config, and the tier files under tiers/ set their
+enforcement levels and thresholds per environment. Prod makes the sizing
+policies mandatory, which the program's defaults fail: prod stacks set
+db_storage_type, db_instance_class, redis_node_type, api_desired_count and
+front_desired_count.
+"""
+
+import json
+
+from pulumi_policy import (
+    EnforcementLevel,
+    PolicyConfigSchema,
+    ResourceValidationPolicy,
+)
+
+TIERS = ["dev", "staging", "prod"]
+
+TIER_SCHEMA = {
+    "type": "string",
+    "enum": TIERS,
+    "default": "dev",
+}
+
+
+def tier(args):
+    return args.get_config().get("tier", "dev")
+
+
+def number(value):
+    """
+    A known numeric property, which the engine may pass as a float, or None.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value)
+
+
+def rds_storage_type(args, report_violation):
+    if args.resource_type != "aws:rds/instance:Instance":
+        return
+    storage_type = args.props.get("storageType")
+    if storage_type in ("gp2", "standard"):
+        report_violation(
+            f"RDS instance '{args.name}' uses {storage_type} storage, whose IOPS "
+            "scale with its size and run out of burst credits; use gp3, which "
+            "has a 3000 IOPS baseline at any size."
+        )
+
+
+def burstable_instances(args, report_violation):
+    if args.resource_type == "aws:rds/instance:Instance":
+        instance_class = args.props.get("instanceClass")
+        prefix = "db.t"
+    elif args.resource_type == "aws:elasticache/cluster:Cluster":
+        instance_class = args.props.get("nodeType")
+        prefix = "cache.t"
+    else:
+        return
+    if not isinstance(instance_class, str) or not instance_class.startswith(prefix):
+        return
+    if tier(args) in args.get_config().get("allowed_tiers", ["dev"]):
+        return
+    report_violation(
+        f"'{args.name}' uses the burstable {instance_class} class in {tier(args)}, "
+        "which is throttled to its baseline once CPU credits run out; use an "
+        "m or r class."
+    )
+
+
+def service_desired_count(args, report_violation):
+    if args.resource_type != "aws:ecs/service:Service":
+        return
+    # Only services behind a load balancer serve traffic; the clock and
+    # migration tasks are singletons on purpose
+    if not args.props.get("loadBalancers"):
+        return
+    desired_count = number(args.props.get("desiredCount"))
+    minimum = args.get_config().get("minimum", 2)
+    if desired_count is not None and desired_count < minimum:
+        report_violation(
+            f"Service '{args.name}' runs {desired_count} task(s) in {tier(args)}; "
+            f"run at least {minimum} so a deployment or a task failure does not "
+            "leave the load balancer without capacity."
+        )
+
+
+def non_blocking_logs(args, report_violation):
+    if args.resource_type != "aws:ecs/taskDefinition:TaskDefinition":
+        return
+    definitions = args.props.get("containerDefinitions")
+    # Unknown during previews of new task definitions
+    if not isinstance(definitions, str):
+        return
+    for container in json.loads(definitions):
+        log_configuration = container.get("logConfiguration") or {}
+        if log_configuration.get("logDriver") != "awslogs":
+            continue
+        options = log_configuration.get("options") or {}
+        if options.get("mode") != "non-blocking":
+            report_violation(
+                f"Container '{container.get('name')}' of '{args.name}' logs to "
+                "awslogs in blocking mode, so a slow CloudWatch Logs API stalls "
+                "the application's writes to stdout; set mode to non-blocking."
+            )
+
+
+def deregistration_delay(args, report_violation):
+    if args.resource_type != "aws:lb/targetGroup:TargetGroup":
+        return
+    # AWS defaults to 300 seconds when unset
+    delay = number(args.props.get("deregistrationDelay", 300))
+    maximum = args.get_config().get("maximum", 60)
+    if delay is not None and delay > maximum:
+        report_violation(
+            f"Target group '{args.name}' drains targets for {delay}s, which every "
+            f"rolling deployment waits on; keep it under {maximum}s."
+        )
+
+
+def load_balancer_http2(args, report_violation):
+    if args.resource_type != "aws:lb/loadBalancer:LoadBalancer":
+        return
+    if args.props.get("enableHttp2") is False:
+        report_violation(
+            f"Load balancer '{args.name}' has HTTP/2 disabled, so clients open a "
+            "connection per concurrent request."
+        )
+
+
+def container_insights(args, report_violation):
+    if args.resource_type != "aws:ecs/cluster:Cluster":
+        return
+    settings = {
+        setting.get("name"): setting.get("value")
+        for setting in args.props.get("settings") or []
+    }
+    if settings.get("containerInsights") not in ("enabled", "enhanced"):
+        report_violation(
+            f"Cluster '{args.name}' has Container Insights disabled, leaving no "
+            "per-task CPU and memory metrics to size or debug the services."
+        )
+
+
+def schema(**properties):
+    return PolicyConfigSchema(properties={"tier": TIER_SCHEMA, **properties})
+
+
+POLICIES = [
+    ResourceValidationPolicy(
+        name="rds-storage-type",
+        description="RDS instances use gp3 rather than gp2 or magnetic storage.",
+        validate=rds_storage_type,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(),
+    ),
+    ResourceValidationPolicy(
+        name="burstable-instances",
+        description="RDS and ElastiCache avoid burstable t classes outside dev.",
+        validate=burstable_instances,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(
+            allowed_tiers={
+                "type": "array",
+                "items": {"type": "string", "enum": TIERS},
+                "default": ["dev"],
+            }
+        ),
+    ),
+    ResourceValidationPolicy(
+        name="service-desired-count",
+        description="ECS services behind a load balancer run more than one task.",
+        validate=service_desired_count,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(minimum={"type": "integer", "default": 2}),
+    ),
+    ResourceValidationPolicy(
+        name="non-blocking-logs",
+        description="Containers logging to awslogs use the non-blocking mode.",
+        validate=non_blocking_logs,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(),
+    ),
+    ResourceValidationPolicy(
+        name="deregistration-delay",
+        description="Target groups drain quickly enough for rolling deployments.",
+        validate=deregistration_delay,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(maximum={"type": "integer", "default": 60}),
+    ),
+    ResourceValidationPolicy(
+        name="load-balancer-http2",
+        description="Load balancers keep HTTP/2 enabled.",
+        validate=load_balancer_http2,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(),
+    ),
+    ResourceValidationPolicy(
+        name="container-insights",
+        description="ECS clusters have Container Insights enabled.",
+        validate=container_insights,
+        enforcement_level=EnforcementLevel.ADVISORY,
+        config_schema=schema(),
+    ),
+]
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+
+from pulumi import AssetArchive, ComponentResource, FileAsset, Output, ResourceOptions
+from pulumi_aws import cloudwatch, iam, s3, ssm, synthetics
+
+CANARY_SCRIPT = os.path.join(os.path.dirname(__file__), "canary", "lago_canary.py")
+
+# Checks run by the canary script, each with its own latency alarm
+CANARY_CHECKS = ["api-health", "front", "api-read", "api-ingest"]
+
+
+def canary_policy(bucket_arn, api_key_parameter_arn=None):
+    """
+    Permissions of the canary role: its artifacts, logs and metrics, and
+    reading the API key parameter when there is one.
+    """
+    statements = [
+        {
+            "Effect": "Allow",
+            "Action": ["s3:PutObject", "s3:GetObject"],
+            "Resource": f"{bucket_arn}/*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": [
+                "s3:GetBucketLocation",
+                "s3:ListAllMyBuckets",
+            ],
+            "Resource": "*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": [
+                "logs:CreateLogGroup",
+                "logs:CreateLogStream",
+                "logs:PutLogEvents",
+            ],
+            "Resource": "arn:aws:logs:*:*:log-group:/aws/lambda/cwsyn-*",
+        },
+        {
+            "Effect": "Allow",
+            "Action": "cloudwatch:PutMetricData",
+            "Resource": "*",
+            "Condition": {
+                "StringEquals": {
+                    "cloudwatch:namespace": [
+                        "CloudWatchSynthetics",
+                        "Lago/Canary",
+                    ]
+                }
+            },
+        },
+    ]
+    if api_key_parameter_arn is not None:
+        statements.append(
+            {
+                "Effect": "Allow",
+                "Action": "ssm:GetParameter",
+                "Resource": api_key_parameter_arn,
+            }
+        )
+    return {"Version": "2012-10-17", "Statement": statements}
+
+
+class CanaryArgs:
+
+    def __init__(
+        self,
+        api_url=None,
+        front_url=None,
+        api_key=None,
+        customer_id=None,
+        metric_code=None,
+        schedule="rate(5 minutes)",
+        runtime_version="syn-python-selenium-4.1",
+        latency_threshold_ms=1000,
+        alarm_actions=[],
+    ):
+        self.api_url = api_url
+        self.front_url = front_url
+        self.api_key = api_key
+        # Sandbox customer and billable metric used by the ingestion check
+        self.customer_id = customer_id
+        self.metric_code = metric_code
+        self.schedule = schedule
+        self.runtime_version = runtime_version
+        self.latency_threshold_ms = latency_threshold_ms
+        self.alarm_actions = alarm_actions
+
+
+class Canary(ComponentResource):
+
+    def __init__(
+        self,
+        name: str,
+        args: CanaryArgs,
+        opts: ResourceOptions = None,
+    ):
+        super().__init__("custom:resource:Canary", name, {}, opts)
+
+        # Create a bucket for the canary code and run artifacts
+        self.bucket = s3.Bucket(
+            f"{name}-artifacts",
+            acl="private",
+            force_destroy=True,
+            lifecycle_rules=[
+                s3.BucketLifecycleRuleArgs(
+                    enabled=True,
+                    prefix="runs/",
+                    expiration=s3.BucketLifecycleRuleExpirationArgs(days=14),
+                )
+            ],
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Synthetics Python canaries load their handler from python/
+        with open(CANARY_SCRIPT, "rb") as script:
+            digest = hashlib.sha256(script.read()).hexdigest()[:16]
+        self.code = s3.BucketObjectv2(
+            f"{name}-code",
+            bucket=self.bucket.id,
+            key=f"code/lago_canary-{digest}.zip",
+            source=AssetArchive({"python/lago_canary.py": FileAsset(CANARY_SCRIPT)}),
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Run-config environment variables show in the console and API, so
+        # the API key is stored as a SecureString the canary reads at run time
+        self.api_key_parameter = None
+        if args.api_key is not None:
+            self.api_key_parameter = ssm.Parameter(
+                f"{name}-api-key",
+                type="SecureString",
+                value=Output.secret(args.api_key),
+                opts=ResourceOptions(parent=self),
+            )
+
+        self.role = iam.Role(
+            f"{name}-role",
+            assume_role_policy=json.dumps(
+                {
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Principal": {"Service": "lambda.amazonaws.com"},
+                            "Action": "sts:AssumeRole",
+                        }
+                    ],
+                }
+            ),
+            opts=ResourceOptions(parent=self),
+        )
+
+        iam.RolePolicy(
+            f"{name}-role-policy",
+            role=self.role.id,
+            policy=Output.all(
+                self.bucket.arn,
+                self.api_key_parameter.arn if self.api_key_parameter else None,
+            ).apply(lambda arns: json.dumps(canary_policy(*arns))),
+            opts=ResourceOptions(parent=self),
+        )
+
+        environment = {
+            "CANARY_NAME": name,
+            "API_URL": args.api_url,
+            "FRONT_URL": args.front_url,
+        }
+        if self.api_key_parameter is not None:
+            environment["API_KEY_PARAMETER"] = self.api_key_parameter.name
+        if args.customer_id is not None:
+            environment["CUSTOMER_ID"] = args.customer_id
+        if args.metric_code is not None:
+            environment["METRIC_CODE"] = args.metric_code
+
+        self.canary = synthetics.Canary(
+            f"{name}",
+            name=name,
+            runtime_version=args.runtime_version,
+            handler="lago_canary.handler",
+            execution_role_arn=self.role.arn,
+            artifact_s3_location=Output.concat("s3://", self.bucket.bucket, "/runs/"),
+            s3_bucket=self.code.bucket,
+            s3_key=self.code.key,
+            start_canary=True,
+            schedule=synthetics.CanaryScheduleArgs(expression=args.schedule),
+            run_config=synthetics.CanaryRunConfigArgs(
+                timeout_in_seconds=60,
+                environment_variables=environment,
+            ),
+            success_retention_period=7,
+            failure_retention_period=14,
+            opts=ResourceOptions(parent=self),
+        )
+
+        # Alarm on failed runs and on latency regressions per check
+        self.alarms = [
+            cloudwatch.MetricAlarm(
+                f"{name}-success",
+                alarm_description="Lago canary runs are failing",
+                namespace="CloudWatchSynthetics",
+                metric_name="SuccessPercent",
+                dimensions={"CanaryName": self.canary.name},
+                statistic="Average",
+                period=300,
+                evaluation_periods=2,
+                threshold=100,
+                comparison_operator="LessThanThreshold",
+                alarm_actions=args.alarm_actions,
+                ok_actions=args.alarm_actions,
+                treat_missing_data="breaching",
+                opts=ResourceOptions(parent=self),
+            )
+        ]
+
+        for check in CANARY_CHECKS:
+            self.alarms.append(
+                cloudwatch.MetricAlarm(
+                    f"{name}-{check}-latency",
+                    alarm_description=f"Lago canary {check} latency regressed",
+                    namespace="Lago/Canary",
+                    metric_name="Latency",
+                    dimensions={"Canary": name, "Check": check},
+                    statistic="Average",
+                    period=300,
+                    evaluation_periods=3,
+                    datapoints_to_alarm=2,
+                    threshold=args.latency_threshold_ms,
+                    comparison_operator="GreaterThanThreshold",
+                    alarm_actions=args.alarm_actions,
+                    ok_actions=args.alarm_actions,
+                    treat_missing_data="notBreaching",
+                    opts=ResourceOptions(parent=self),
+                )
+            )
+
+        self.register_outputs({})
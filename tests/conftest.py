@@ -0,0 +1,37 @@
+"""
+Fixtures constructing components and programs offline, under the mocks of
+benchmarks/mocks.py.
+"""
+
+import pytest
+from pulumi_aws import iam
+
+from benchmarks import mocks
+
+
+@pytest.fixture
+def construct():
+    """
+    Calls a function creating resources under mocks and returns the run.
+    """
+
+    def construct(build, config=None, **kwargs):
+        return mocks.run(build, config, **kwargs)
+
+    return construct
+
+
+@pytest.fixture
+def program():
+    """
+    Runs the whole program under mocks with the given config.
+    """
+    return mocks.run_program
+
+
+@pytest.fixture
+def task_role():
+    """
+    Creates a task role to hand to components; call it under mocks.
+    """
+    return lambda: iam.Role("task-role", assume_role_policy="{}")
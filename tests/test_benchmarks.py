@@ -0,0 +1,24 @@
+from benchmarks import construction, startup_time
+
+
+def test_construction_benchmark():
+    results = construction.benchmark(stacks=2, repeat=1)
+
+    assert set(results["components"]) == set(construction.COMPONENTS)
+    for component in results["components"].values():
+        assert component["resources"] > 0
+        assert component["outputs"] > 0
+        assert component["peak_memory_kb"] > 0
+    assert results["stack"]["resources"] > results["components"]["Backend"]["resources"]
+    assert results["stacks"]["count"] == 2
+    assert results["stacks"]["resources"] >= 2 * results["stack"]["resources"]
+
+
+def test_startup_within_budget():
+    results = startup_time.benchmark(runs=3)
+
+    assert startup_time.over_budget(results) == []
+
+
+def test_committed_construction_results_are_current():
+    assert construction.stale_counts() == []
@@ -0,0 +1,19 @@
+import json
+
+import bucket
+
+
+def test_bucket_access_is_granted_to_the_task_role(construct):
+    run = construct(
+        lambda: bucket.Bucket("storage", bucket.BucketArgs(role_name="task-role"))
+    )
+
+    assert run.named("storage").inputs["acl"] == "private"
+    policy = json.loads(run.named("storage-access-policy").inputs["policy"])
+    assert policy["Statement"][0]["Resource"] == [
+        "arn:aws:mock:us-east-1:123456789012:storage/*",
+        "arn:aws:mock:us-east-1:123456789012:storage",
+    ]
+    attachment = run.named("storage-s3-role-policy-attachment")
+    assert attachment.inputs["role"] == "task-role"
+    assert "storage-access-policy" in run.depends_on(attachment.name)
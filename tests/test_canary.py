@@ -0,0 +1,255 @@
+import http.server
+import json
+import sys
+import threading
+import types
+
+import pytest
+
+import synthetics
+from canary import lago_canary
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers the canary's requests, requiring the API key on /api/ paths and
+    failing the paths listed in the server's `failing`.
+    """
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond()
+
+    def respond(self):
+        path = self.path.split("?")[0]
+        self.server.paths.append((self.command, path))
+        if path in self.server.failing:
+            status = 500
+        elif path.startswith("/api/") and (
+            self.headers.get("Authorization") != "Bearer key"
+        ):
+            status = 401
+        else:
+            status = 200
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.paths = []
+    server.failing = set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "api_key, customer_id, metric_code, expected",
+    [
+        (None, None, None, ["api-health", "front"]),
+        (None, "acme", "calls", ["api-health", "front"]),
+        ("key", None, None, ["api-health", "front", "api-read"]),
+        ("key", "acme", None, ["api-health", "front", "api-read"]),
+        ("key", None, "calls", ["api-health", "front", "api-read"]),
+        ("key", "acme", "calls", ["api-health", "front", "api-read", "api-ingest"]),
+    ],
+)
+def test_checks_depend_on_credentials(api_key, customer_id, metric_code, expected):
+    planned = lago_canary.checks(
+        "http://api/", "http://front/", api_key, customer_id, metric_code
+    )
+
+    assert [check[0] for check in planned] == expected
+    assert set(expected) <= set(synthetics.CANARY_CHECKS)
+
+
+def test_run_checks_against_stub(stub):
+    results = lago_canary.run_checks(stub.url, stub.url, "key", "acme", "calls")
+
+    assert {result["check"]: result["status"] for result in results} == {
+        "api-health": 200,
+        "front": 200,
+        "api-read": 200,
+        "api-ingest": 200,
+    }
+    assert all(result["ok"] for result in results)
+    assert ("POST", "/api/v1/events") in stub.paths
+    assert ("GET", "/api/v1/billable_metrics") in stub.paths
+
+
+def test_status_maps_to_ok(stub):
+    stub.failing.add("/health")
+
+    results = {
+        result["check"]: result
+        for result in lago_canary.run_checks(stub.url, stub.url, "wrong")
+    }
+
+    assert (results["api-health"]["status"], results["api-health"]["ok"]) == (
+        500,
+        False,
+    )
+    assert (results["api-read"]["status"], results["api-read"]["ok"]) == (401, False)
+    assert results["front"]["ok"]
+
+
+def test_unreachable_target_is_not_ok():
+    status, _ = lago_canary.timed_request("http://127.0.0.1:9/health", timeout=1)
+
+    assert status == 0
+
+
+def test_metric_data():
+    results = [
+        {"check": "api-health", "status": 200, "ok": True, "latency_ms": 12.5},
+        {"check": "front", "status": 500, "ok": False, "latency_ms": 40.0},
+    ]
+
+    data = lago_canary.metric_data(results, "lago-canary")
+
+    assert len(data) == 4
+    dimensions = [
+        {"Name": "Canary", "Value": "lago-canary"},
+        {"Name": "Check", "Value": "front"},
+    ]
+    assert {
+        "MetricName": "Latency",
+        "Dimensions": dimensions,
+        "Value": 40.0,
+        "Unit": "Milliseconds",
+    } in data
+    assert {
+        "MetricName": "Success",
+        "Dimensions": dimensions,
+        "Value": 0,
+        "Unit": "Count",
+    } in data
+    assert lago_canary.metric_data(results)[0]["Dimensions"] == [
+        {"Name": "Check", "Value": "api-health"}
+    ]
+
+
+@pytest.fixture
+def cloudwatch(monkeypatch):
+    """
+    Stands in for boto3, which only the Synthetics runtime provides: records
+    the metric data put, and holds the API key in a "lago-canary-api-key"
+    parameter.
+    """
+    put = []
+
+    class CloudWatch:
+        def put_metric_data(self, **kwargs):
+            put.append(kwargs)
+
+    class Ssm:
+        def get_parameter(self, Name, WithDecryption):
+            assert (Name, WithDecryption) == ("lago-canary-api-key", True)
+            return {"Parameter": {"Name": Name, "Value": "key"}}
+
+    clients = {"cloudwatch": CloudWatch, "ssm": Ssm}
+    monkeypatch.setitem(
+        sys.modules,
+        "boto3",
+        types.SimpleNamespace(client=lambda service: clients[service]()),
+    )
+    return put
+
+
+def test_handler_publishes_and_raises_on_failure(stub, cloudwatch, monkeypatch):
+    monkeypatch.setenv("CANARY_NAME", "lago-canary")
+    monkeypatch.setenv("API_URL", stub.url)
+    monkeypatch.setenv("FRONT_URL", stub.url)
+    monkeypatch.delenv("API_KEY_PARAMETER", raising=False)
+
+    assert len(lago_canary.handler({}, None)) == 2
+    assert cloudwatch[0]["Namespace"] == "Lago/Canary"
+    assert cloudwatch[0]["MetricData"][0]["Dimensions"][0] == {
+        "Name": "Canary",
+        "Value": "lago-canary",
+    }
+
+    stub.failing.add("/")
+    with pytest.raises(Exception, match="Failed checks: front"):
+        lago_canary.handler({}, None)
+    assert len(cloudwatch) == 2
+
+
+def test_handler_reads_the_api_key_parameter(stub, cloudwatch, monkeypatch):
+    monkeypatch.setenv("API_URL", stub.url)
+    monkeypatch.setenv("FRONT_URL", stub.url)
+    monkeypatch.setenv("API_KEY_PARAMETER", "lago-canary-api-key")
+
+    results = {result["check"]: result for result in lago_canary.handler({}, None)}
+
+    assert results["api-read"]["status"] == 200
+
+
+def test_canary_component(construct):
+    def build():
+        synthetics.Canary(
+            "canary",
+            synthetics.CanaryArgs(
+                api_url="http://api", front_url="http://front", api_key="key"
+            ),
+        )
+
+    run = construct(build)
+
+    environment = run.named("canary").inputs["runConfig"]["environmentVariables"]
+    assert environment["CANARY_NAME"] == "canary"
+    assert "API_KEY" not in environment
+    assert "key" not in environment.values()
+    assert environment["API_KEY_PARAMETER"] == "canary-api-key"
+
+    parameter = run.named("canary-api-key").inputs
+    assert parameter["type"] == "SecureString"
+    # Secret values reach the mocks wrapped with the secret signature
+    assert parameter["value"]["value"] == "key"
+    policy = json.loads(run.named("canary-role-policy").inputs["policy"])
+    assert {
+        "Effect": "Allow",
+        "Action": "ssm:GetParameter",
+        "Resource": "arn:aws:mock:us-east-1:123456789012:canary-api-key",
+    } in policy["Statement"]
+
+    alarms = {
+        alarm.name: alarm.inputs
+        for alarm in run.of_type("aws:cloudwatch/metricAlarm:MetricAlarm")
+    }
+    for check in synthetics.CANARY_CHECKS:
+        assert alarms[f"canary-{check}-latency"]["dimensions"] == {
+            "Canary": "canary",
+            "Check": check,
+        }
+
+
+def test_canary_without_api_key(construct):
+    run = construct(
+        lambda: synthetics.Canary(
+            "canary",
+            synthetics.CanaryArgs(api_url="http://api", front_url="http://front"),
+        )
+    )
+
+    environment = run.named("canary").inputs["runConfig"]["environmentVariables"]
+    assert "API_KEY_PARAMETER" not in environment
+    assert not run.of_type("aws:ssm/parameter:Parameter")
+    policy = json.loads(run.named("canary-role-policy").inputs["policy"])
+    assert all(
+        statement["Action"] != "ssm:GetParameter" for statement in policy["Statement"]
+    )
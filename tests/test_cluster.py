@@ -0,0 +1,44 @@
+import json
+
+import cluster
+
+
+def test_cluster_defaults(construct):
+    run = construct(lambda: cluster.Cluster("ecs"))
+
+    assert run.named("ecs").inputs["settings"] == [
+        {"name": "containerInsights", "value": "enabled"}
+    ]
+    assert (
+        run.named("ecs-task-policy").inputs["policyArn"]
+        == "arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy"
+    )
+    assert "ecs-task-xray-policy-attachment" not in {
+        resource.name for resource in run.resources
+    }
+
+
+def test_log_policy_is_scoped_to_the_account(construct):
+    run = construct(lambda: cluster.Cluster("ecs"))
+
+    policy = json.loads(run.named("ecs-task-log-policy").inputs["policy"])
+    assert policy["Statement"][0]["Resource"][0] == (
+        "arn:aws:logs:us-east-1:123456789012:log-group:/ecs/*"
+    )
+    assert [invoke.token for invoke in run.invokes] == [
+        "aws:index/getCallerIdentity:getCallerIdentity"
+    ]
+
+
+def test_cluster_options(construct):
+    run = construct(
+        lambda: cluster.Cluster(
+            "ecs", cluster.ClusterArgs(tracing=True, container_insights=False)
+        )
+    )
+
+    assert run.named("ecs").inputs["settings"][0]["value"] == "disabled"
+    assert (
+        run.named("ecs-task-xray-policy-attachment").inputs["policyArn"]
+        == "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+    )
@@ -0,0 +1,149 @@
+import json
+import os
+
+import pytest
+from pulumi.automation import events as engine_events
+
+import critical_path
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+STACK = "urn:pulumi:prod::lago-pulumi::pulumi:pulumi:Stack::lago-pulumi-prod"
+
+
+@pytest.fixture(scope="module")
+def steps():
+    return critical_path.collect_steps(
+        critical_path.read_event_log(os.path.join(FIXTURES, "create-events.jsonl"))
+    )
+
+
+@pytest.fixture(scope="module")
+def state():
+    with open(os.path.join(FIXTURES, "create-state.json")) as state_file:
+        return critical_path.state_dependencies(json.load(state_file))
+
+
+def event(sequence, timestamp, kind, urn, op="create", parent=STACK, custom=True):
+    resource_type = urn.split("::")[2].split("$")[-1]
+    metadata = {
+        "op": op,
+        "urn": urn,
+        "type": resource_type,
+        "new": {"type": resource_type, "urn": urn, "parent": parent, "custom": custom},
+    }
+    return engine_events.EngineEvent.from_json(
+        {"sequence": sequence, "timestamp": timestamp, kind: {"metadata": metadata}}
+    )
+
+
+def urn(type_chain, name):
+    return f"urn:pulumi:prod::lago-pulumi::{type_chain}::{name}"
+
+
+def test_resource_key():
+    assert (
+        critical_path.resource_key(
+            "urn:pulumi:prod::lago-pulumi::custom:resource:Redis$aws:elasticache/cluster:Cluster::lago-redis"
+        )
+        == "custom:resource:Redis$aws:elasticache/cluster:Cluster::lago-redis"
+    )
+    # Mocks include the stack type in the chain of its direct children
+    assert critical_path.resource_key(
+        "urn:pulumi:dev::lago-pulumi::pulumi:pulumi:Stack$custom:resource:Redis::lago-redis"
+    ) == critical_path.resource_key(
+        "urn:pulumi:prod::lago-pulumi::custom:resource:Redis::lago-redis"
+    )
+
+
+def test_step_durations(steps):
+    by_name = {step.name: step for step in steps.values() if step.custom}
+
+    assert by_name["lago-redis"].duration == 563
+    assert by_name["lago-db-rds"].duration == 412
+    assert by_name["lago-be-migrate"].duration == 141
+    assert by_name["lago-redis"].parent == "custom:resource:Redis::lago-redis"
+    assert not steps["custom:resource:Backend::lago-be"].custom
+
+
+def test_critical_path(steps, state):
+    report = critical_path.Profile(steps, state).report()
+
+    assert report["wall_seconds"] == 728
+    assert [entry["resource"] for entry in report["critical_path"]] == [
+        "lago-net-vpc",
+        "lago-net-subnet-us-east-1c",
+        "lago-redis-sng",
+        "lago-redis",
+        "lago-be-migrate-task",
+        "lago-be-migrate",
+        "lago-be-clock-svc",
+        "lago-monitoring-clock-memoryutilization",
+    ]
+    assert report["slowest"][0] == {
+        "resource": "lago-redis",
+        "op": "create",
+        "seconds": 563,
+    }
+
+
+def test_parallelism(steps, state):
+    profile = critical_path.Profile(steps, state)
+
+    assert profile.busy_time == 1974
+    assert profile.parallelism == pytest.approx(1974 / 728)
+    assert profile.peak_concurrency == 14
+    components = profile.report()["components"]
+    assert components["lago-redis"] == {"start": 14, "end": 579, "busy_seconds": 565}
+    assert components["(stack)"]["busy_seconds"] == 6
+
+
+def test_program_dependencies_match_the_state(steps, state):
+    from_program = critical_path.program_dependencies()
+
+    for key in steps:
+        assert sorted(from_program.get(key, [])) == sorted(state.get(key, []))
+
+
+def test_depending_on_a_component_waits_on_its_children():
+    component = urn("custom:resource:Db", "db")
+    instance = urn("custom:resource:Db$aws:rds/instance:Instance", "db-rds")
+    service = urn("aws:ecs/service:Service", "svc")
+    events = [
+        event(0, 0, "resourcePreEvent", component, custom=False),
+        event(1, 0, "resourcePreEvent", instance, parent=component),
+        event(2, 300, "resOutputsEvent", instance, parent=component),
+        event(3, 300, "resOutputsEvent", component, custom=False),
+        event(4, 300, "resourcePreEvent", service),
+        event(5, 310, "resOpFailedEvent", service),
+    ]
+    steps = critical_path.collect_steps(events)
+    dependencies = {
+        critical_path.resource_key(service): [critical_path.resource_key(component)]
+    }
+
+    path = critical_path.Profile(steps, dependencies).report()["critical_path"]
+
+    assert [(entry["resource"], entry["seconds"]) for entry in path] == [
+        ("db-rds", 300),
+        ("svc", 10),
+    ]
+    assert path[-1]["failed"]
+
+
+def test_unchanged_and_planned_steps_are_ignored():
+    bucket = urn("aws:s3/bucket:Bucket", "bucket")
+    events = [
+        event(0, 0, "resourcePreEvent", bucket, op="same"),
+        event(1, 5, "resOutputsEvent", bucket, op="same"),
+    ]
+
+    assert critical_path.collect_steps(events) == {}
+
+
+def test_format_report(steps, state):
+    text = critical_path.format_report(critical_path.Profile(steps, state).report())
+
+    assert text.splitlines()[0] == (
+        "Wall time 728s, resources busy for 1974s: parallelism 2.71, at most 14 at once"
+    )
+    assert "lago-redis [aws:elasticache/cluster:Cluster]" in text
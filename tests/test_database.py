@@ -0,0 +1,44 @@
+import database
+
+
+def test_db(construct):
+    run = construct(
+        lambda: database.Db(
+            "db",
+            database.DbArgs(
+                db_name="lago",
+                db_user="lago",
+                db_password="secret",
+                subnet_ids=["subnet-a", "subnet-b"],
+                security_group_ids=["sg-rds"],
+            ),
+        )
+    )
+
+    instance = run.named("db-rds").inputs
+    assert instance["engine"] == "postgres"
+    assert instance["instanceClass"] == "db.t4g.micro"
+    assert instance["allocatedStorage"] == 20
+    assert instance["publiclyAccessible"] is False
+    assert instance["vpcSecurityGroupIds"] == ["sg-rds"]
+    assert run.named("db-sng").inputs["subnetIds"] == ["subnet-a", "subnet-b"]
+    assert "db-sng" in run.depends_on("db-rds")
+
+
+def test_redis(construct):
+    run = construct(
+        lambda: database.Redis(
+            "redis",
+            database.RedisArgs(
+                redis_name="lago",
+                subnet_ids=["subnet-a", "subnet-b"],
+                security_group_ids=["sg-redis"],
+            ),
+        )
+    )
+
+    cluster = run.named("redis").inputs
+    assert cluster["engine"] == "redis"
+    assert cluster["numCacheNodes"] == 1
+    assert cluster["securityGroupIds"] == ["sg-redis"]
+    assert "redis-sng" in run.depends_on("redis")
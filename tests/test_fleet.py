@@ -0,0 +1,162 @@
+import shutil
+import threading
+import time
+
+import pytest
+
+import fleet
+from benchmarks import mocks
+
+FLEET = """
+config:
+  lago_version: 1.20.0
+  aws:region: eu-west-1
+stacks:
+  acme-eu:
+    config:
+      service_name: acme
+  globex-us:
+    config:
+      service_name: globex
+      aws:region: us-east-1
+      canary: true
+      availability_zones: [us-east-1a, us-east-1b, us-east-1d]
+      db_password:
+        value: hunter2
+        secret: true
+"""
+
+
+@pytest.fixture
+def stacks(tmp_path):
+    path = tmp_path / "fleet.yaml"
+    path.write_text(FLEET)
+    return fleet.load_fleet(path)
+
+
+def test_stack_config_overlays_fleet_config(stacks):
+    acme, globex = stacks
+
+    assert acme.name == "acme-eu"
+    assert acme.config == {
+        "lago_version": "1.20.0",
+        "aws:region": "eu-west-1",
+        "service_name": "acme",
+    }
+    assert globex.config["aws:region"] == "us-east-1"
+    assert globex.config["lago_version"] == "1.20.0"
+
+
+def test_config_values(stacks):
+    values = fleet.config_values(stacks[1].config)
+
+    assert values["lago-pulumi:service_name"].value == "globex"
+    assert values["aws:region"].value == "us-east-1"
+    assert values["lago-pulumi:canary"].value == "true"
+    assert values["lago-pulumi:availability_zones"].value == (
+        '["us-east-1a", "us-east-1b", "us-east-1d"]'
+    )
+    assert values["lago-pulumi:db_password"].value == "hunter2"
+    assert values["lago-pulumi:db_password"].secret
+    assert not values["lago-pulumi:service_name"].secret
+
+
+def test_inline_program_takes_the_stack_config(stacks):
+    spec = stacks[1]
+    config = {
+        key: value.value for key, value in fleet.config_values(spec.config).items()
+    }
+
+    run = mocks.run(fleet.program, config, stack=spec.name)
+
+    assert run.named("globex-net-subnet-us-east-1d")
+    assert run.named("globex-canary")
+    api = run.containers("globex-be-api-task")["globex-be-api-container"]
+    assert api["image"] == "getlago/api:v1.20.0"
+
+
+def test_concurrency_is_bounded():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def run_stack(spec, operation):
+        with lock:
+            running.append(spec.name)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(spec.name)
+        return {"create": 1}
+
+    specs = [fleet.StackSpec(f"stack-{index}") for index in range(8)]
+    results = fleet.Fleet(
+        specs, concurrency=3, run_stack=run_stack, log=lambda line: None
+    ).run()
+
+    assert max(peak) == 3
+    assert [result.name for result in results] == [spec.name for spec in specs]
+    assert all(result.status == "succeeded" for result in results)
+    assert results[0].changes == {"create": 1}
+
+
+def failing_on(name):
+    def run_stack(spec, operation):
+        if spec.name == name:
+            raise RuntimeError("boom")
+        return {"same": 3}
+
+    return run_stack
+
+
+def test_fail_fast_skips_the_stacks_not_started():
+    specs = [fleet.StackSpec(name) for name in ("a", "b", "c")]
+
+    results = fleet.Fleet(
+        specs, concurrency=1, run_stack=failing_on("b"), log=lambda line: None
+    ).run()
+
+    assert [result.status for result in results] == ["succeeded", "failed", "skipped"]
+    assert results[1].error == "boom"
+
+
+def test_continue_on_error_runs_every_stack():
+    specs = [fleet.StackSpec(name) for name in ("a", "b", "c")]
+
+    results = fleet.Fleet(
+        specs,
+        concurrency=1,
+        continue_on_error=True,
+        run_stack=failing_on("b"),
+        log=lambda line: None,
+    ).run()
+
+    assert [result.status for result in results] == ["succeeded", "failed", "succeeded"]
+
+
+def test_summary():
+    table = fleet.summary(
+        [
+            fleet.StackResult("a", "succeeded", 12.34, {"create": 2, "same": 5}),
+            fleet.StackResult("b", "failed", 1.0, error="boom"),
+            fleet.StackResult("c", "skipped"),
+        ]
+    )
+
+    lines = table.splitlines()
+    assert lines[1].split() == ["a", "succeeded", "12.3s", "create=2", "same=5"]
+    assert lines[2].split() == ["b", "failed", "1.0s", "boom"]
+    assert lines[3].split() == ["c", "skipped", "0.0s", "-"]
+
+
+@pytest.mark.skipif(shutil.which("pulumi") is None, reason="needs the pulumi CLI")
+def test_stacks_on_a_file_backend(stacks, tmp_path, monkeypatch):
+    monkeypatch.setenv("PULUMI_CONFIG_PASSPHRASE", "test")
+
+    stack = fleet.select_stack(
+        stacks[1], backend_url=f"file://{tmp_path}", secrets_provider="passphrase"
+    )
+
+    config = stack.get_all_config()
+    assert config["lago-pulumi:service_name"].value == "globex"
+    assert config["lago-pulumi:db_password"].secret
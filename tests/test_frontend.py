@@ -0,0 +1,59 @@
+import frontend
+from benchmarks.mocks import environment
+
+
+def build(task_role, **kwargs):
+    def build():
+        frontend.Frontend(
+            "front",
+            frontend.FrontendArgs(
+                lago_version="1.2.3",
+                cluster_arn="arn:aws:ecs:us-east-1:123456789012:cluster/lago",
+                role=task_role(),
+                vpc_id="vpc-1",
+                subnet_ids=["subnet-a", "subnet-b"],
+                security_group_ids=["sg-app"],
+                api_url="api.example.com",
+                alb_arn="arn:aws:elasticloadbalancing:us-east-1:123456789012:alb",
+                **kwargs,
+            ),
+        )
+
+    return build
+
+
+def test_task(construct, task_role):
+    run = construct(build(task_role))
+
+    task = run.named("front-task").inputs
+    assert (task["cpu"], task["memory"]) == ("256", "512")
+
+    container = run.containers("front-task")["front-container"]
+    assert container["image"] == "getlago/front:v1.2.3"
+    assert container["portMappings"] == [
+        {"containerPort": 80, "hostPort": 80, "protocol": "tcp"}
+    ]
+    assert environment(container) == {
+        "APP_ENV": "production",
+        "API_URL": "http://api.example.com",
+        "CODEGEN_API": "http://api.example.com",
+    }
+
+
+def test_service(construct, task_role):
+    run = construct(build(task_role))
+
+    service = run.named("front-svc").inputs
+    assert service["loadBalancers"][0]["containerPort"] == 80
+    assert service["networkConfiguration"]["securityGroups"] == ["sg-app"]
+    assert "front-listener" in run.depends_on("front-svc")
+    assert run.named("front-listener").inputs["port"] == 80
+    assert run.named("front-tg").inputs["healthCheck"]["path"] == "/"
+
+
+def test_blue_green(construct, task_role):
+    run = construct(build(task_role, deployment_controller="CODE_DEPLOY"))
+
+    assert run.named("front-tg-green")
+    assert "front-test-listener" in run.depends_on("front-svc")
+    assert len(run.of_type("aws:codedeploy/deploymentGroup:DeploymentGroup")) == 1
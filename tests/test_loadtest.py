@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+import loadtest
+
+
+def run_async(coroutine):
+    """
+    Runs a coroutine on a loop of its own, as asyncio.run() would leave the
+    main thread without the event loop the Pulumi mocks of other tests use.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def load(stub_options=None, **options):
+    """
+    Runs a load test against a fresh stub server and returns the report and
+    the stub.
+    """
+
+    async def run():
+        async with loadtest.StubServer(**(stub_options or {})) as stub:
+            test = loadtest.LoadTest(stub.url, **options)
+            return await test.run(), stub
+
+    return run_async(run())
+
+
+def test_single_events_over_pooled_connections():
+    report, stub = load(requests=200, concurrency=4)
+
+    assert report["requests"] == report["succeeded"] == 200
+    assert report["events"] == len(stub.events) == 200
+    assert report["errors"] == {}
+    assert report["connections"] == stub.connections <= 4
+    latency = report["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+
+
+def test_batches_respect_size_and_cardinality():
+    report, stub = load(
+        mode=loadtest.BATCH,
+        batch_size=25,
+        requests=20,
+        events=loadtest.EventFactory(customers=3, metrics=2, seed=1),
+    )
+
+    assert stub.requests == 20
+    assert report["events"] == len(stub.events) == 500
+    assert {event["external_customer_id"] for event in stub.events} == {
+        "loadtest-customer-0",
+        "loadtest-customer-1",
+        "loadtest-customer-2",
+    }
+    assert len({event["code"] for event in stub.events}) == 2
+    assert len({event["transaction_id"] for event in stub.events}) == 500
+    assert report["throughput"]["events_per_second"] == pytest.approx(
+        report["throughput"]["requests_per_second"] * 25, rel=0.01
+    )
+
+
+def test_rate_paces_requests():
+    report, _ = load(requests=20, rate=100, concurrency=8)
+
+    # The 20th request is due 190ms after the first
+    assert report["duration_seconds"] >= 0.19
+    assert report["requests"] == 20
+
+
+def test_duration_bounds_the_test():
+    report, _ = load(duration=0.2, rate=50)
+
+    assert report["requests"] == 10
+
+
+def test_errors_are_broken_down_by_status():
+    report, stub = load({"api_key": "secret"}, api_key="wrong", requests=5)
+
+    assert report["failed"] == 5
+    assert report["errors"] == {"401": 5}
+    assert stub.events == []
+
+    report, _ = load(
+        {"api_key": "secret", "error_rate": 1.0}, api_key="secret", requests=3
+    )
+    assert report["errors"] == {"500": 3}
+
+
+def test_unreachable_target_is_a_connection_error():
+    async def run():
+        # Take a free port, then close it so nothing listens there
+        async with loadtest.StubServer() as stub:
+            url = stub.url
+        return await loadtest.LoadTest(url, requests=3, concurrency=1).run()
+
+    report = run_async(run())
+
+    assert report["errors"] == {"connection": 3}
+    assert report["latency_ms"]["p50"] is None
+
+
+def test_stub_validates_events():
+    stub = loadtest.StubServer()
+
+    assert stub.handle("POST", "/api/v1/events", {}, b'{"event": {}}')[0] == 422
+    assert stub.handle("POST", "/api/v1/events/batch", {}, b"{}")[0] == 400
+    assert stub.handle("GET", "/api/v1/events", {}, b"")[0] == 404
+
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert loadtest.percentile(values, 0.50) == 50
+    assert loadtest.percentile(values, 0.99) == 99
+    assert loadtest.percentile([7], 0.95) == 7
+    assert loadtest.percentile([], 0.5) is None
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        loadtest.LoadTest("http://localhost", mode="stream", requests=1)
+    with pytest.raises(ValueError):
+        loadtest.LoadTest(
+            "http://localhost", mode=loadtest.BATCH, batch_size=101, requests=1
+        )
+    with pytest.raises(ValueError):
+        loadtest.LoadTest("http://localhost")
+
+
+def test_stack_target_reads_outputs_and_config(monkeypatch):
+    from pulumi import automation as auto
+
+    class Stack:
+        def __init__(self, config):
+            self.config = config
+
+        def outputs(self):
+            return {
+                "Lago API URL": auto.OutputValue("http://api.elb.amazonaws.com", False),
+            }
+
+        def get_all_config(self):
+            return self.config
+
+    stacks = {
+        "prod": Stack(
+            {
+                "lago-pulumi:loadtest_api_key": auto.ConfigValue("key", secret=True),
+                "lago-pulumi:canary_api_key": auto.ConfigValue("canary", secret=True),
+            }
+        ),
+        "staging": Stack(
+            {"lago-pulumi:canary_api_key": auto.ConfigValue("canary", secret=True)}
+        ),
+    }
+    monkeypatch.setattr(
+        auto, "select_stack", lambda stack_name, **kwargs: stacks[stack_name]
+    )
+
+    assert loadtest.stack_target("prod") == ("http://api.elb.amazonaws.com", "key")
+    # The canary's key is never used for load
+    assert loadtest.stack_target("staging") == ("http://api.elb.amazonaws.com", None)
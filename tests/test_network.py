@@ -0,0 +1,97 @@
+import network
+
+ZONES = ["eu-west-1a", "eu-west-1b", "eu-west-1c"]
+
+
+def ingress_ports(run, name):
+    return {
+        (rule["fromPort"], rule["toPort"], tuple(rule["cidrBlocks"]))
+        for rule in run.named(name).inputs["ingress"]
+    }
+
+
+def test_subnets_span_three_zones(construct):
+    run = construct(
+        lambda: network.Vpc("net", network.VpcArgs(availability_zones=ZONES))
+    )
+
+    subnets = run.of_type("aws:ec2/subnet:Subnet")
+    assert [subnet.inputs["availabilityZone"] for subnet in subnets] == ZONES
+    assert [subnet.inputs["cidrBlock"] for subnet in subnets] == [
+        "172.42.0.0/24",
+        "172.42.1.0/24",
+        "172.42.2.0/24",
+    ]
+    assert len(run.of_type("aws:ec2/routeTableAssociation:RouteTableAssociation")) == 3
+
+
+def test_zones_are_looked_up_once_when_not_configured(construct):
+    run = construct(lambda: network.Vpc("net", network.VpcArgs()))
+
+    assert [invoke.token for invoke in run.invokes] == [
+        "aws:index/getAvailabilityZones:getAvailabilityZones"
+    ]
+    assert run.named("net-subnet-us-east-1a")
+
+
+def test_security_group_ports(construct):
+    run = construct(
+        lambda: network.Vpc("net", network.VpcArgs(availability_zones=ZONES))
+    )
+
+    assert ingress_ports(run, "net-rds-sg") == {(5432, 5432, ("172.42.0.0/16",))}
+    assert ingress_ports(run, "net-redis-sg") == {(6379, 6379, ("172.42.0.0/16",))}
+    assert ingress_ports(run, "net-be-sg") == {(3000, 3000, ("0.0.0.0/0",))}
+    assert ingress_ports(run, "net-fe-sg") == {
+        (80, 80, ("0.0.0.0/0",)),
+        (443, 443, ("0.0.0.0/0",)),
+    }
+
+
+def test_pdf_security_group_only_admits_the_api(construct):
+    run = construct(
+        lambda: network.Vpc("net", network.VpcArgs(availability_zones=ZONES))
+    )
+
+    ingress = run.named("net-pdf-sg").inputs["ingress"]
+    assert len(ingress) == 1
+    assert (ingress[0]["fromPort"], ingress[0]["toPort"]) == (3000, 3000)
+    assert ingress[0]["protocol"] == "tcp"
+    assert ingress[0]["securityGroups"] == ["net-be-sg-id"]
+    assert not ingress[0].get("cidrBlocks")
+    assert "net-be-sg" in run.depends_on("net-pdf-sg")
+
+
+def test_test_listener_ports_are_only_open_to_the_vpc(construct):
+    run = construct(
+        lambda: network.Vpc(
+            "net",
+            network.VpcArgs(availability_zones=ZONES, test_listener_ports=[8080]),
+        )
+    )
+
+    assert (8080, 8080, ("172.42.0.0/16",)) in ingress_ports(run, "net-fe-sg")
+
+
+def test_load_balancers_access_logs(construct):
+    run = construct(
+        lambda: network.Vpc(
+            "net",
+            network.VpcArgs(availability_zones=ZONES, access_logs_bucket="logs"),
+        )
+    )
+
+    front = run.named("net-front-alb").inputs
+    back = run.named("net-back-alb").inputs
+    assert front["accessLogs"] == {"bucket": "logs", "prefix": "front", "enabled": True}
+    assert back["accessLogs"] == {"bucket": "logs", "prefix": "api", "enabled": True}
+    assert "net-fe-sg" in run.depends_on("net-front-alb")
+    assert len(run.depends_on("net-back-alb")) == 4
+
+
+def test_load_balancers_without_access_logs(construct):
+    run = construct(
+        lambda: network.Vpc("net", network.VpcArgs(availability_zones=ZONES))
+    )
+
+    assert "accessLogs" not in run.named("net-front-alb").inputs
@@ -0,0 +1,34 @@
+import pdf
+
+
+def build(task_role):
+    def build():
+        pdf.Pdf(
+            "pdf",
+            pdf.PdfArgs(
+                cluster_arn="arn:aws:ecs:us-east-1:123456789012:cluster/lago",
+                cluster_name="lago",
+                role=task_role(),
+                vpc_id="vpc-1",
+                subnet_ids=["subnet-a", "subnet-b"],
+                security_group_ids=["sg-pdf"],
+            ),
+        )
+
+    return build
+
+
+def test_renderer_runs_in_the_given_security_groups(construct, task_role):
+    run = construct(build(task_role))
+
+    network = run.named("pdf-svc").inputs["networkConfiguration"]
+    assert network["securityGroups"] == ["sg-pdf"]
+
+
+def test_renderer_is_discoverable_and_autoscaled(construct, task_role):
+    run = construct(build(task_role))
+
+    assert run.named("pdf-ns").inputs["name"] == "lago.local"
+    assert run.named("pdf-sd").inputs["name"] == "pdf"
+    target = run.named("pdf-scaling-target").inputs
+    assert (target["minCapacity"], target["maxCapacity"]) == (1, 4)
@@ -0,0 +1,238 @@
+import json
+import os
+
+import pytest
+from pulumi_policy import ResourceValidationArgs
+
+from policy import performance
+
+TIERS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "policy", "tiers")
+
+
+def validate(policy_name, resource_type, props, name="res", config=None):
+    """
+    Violations a policy reports for a resource with the given inputs.
+    """
+    policy = next(
+        policy for policy in performance.POLICIES if policy.name == policy_name
+    )
+    args = ResourceValidationArgs(
+        resource_type,
+        props,
+        f"urn:pulumi:prod::lago-pulumi::{resource_type}::{name}",
+        name,
+        opts=None,
+        provider=None,
+        config=config or {},
+    )
+    violations = []
+    policy.validate(args, lambda message, urn=None: violations.append(message))
+    return violations
+
+
+def tier_config(tier, policy_name):
+    with open(os.path.join(TIERS_DIR, f"{tier}.json")) as tier_file:
+        return json.load(tier_file)[policy_name]
+
+
+@pytest.mark.parametrize("storage_type", ["gp2", "standard"])
+def test_rds_storage_type_flags_gp2_and_magnetic(storage_type):
+    violations = validate(
+        "rds-storage-type", "aws:rds/instance:Instance", {"storageType": storage_type}
+    )
+
+    assert len(violations) == 1
+    assert "gp3" in violations[0]
+
+
+def test_rds_storage_type_allows_gp3_and_unknown():
+    for props in [{"storageType": "gp3"}, {"storageType": "io1"}, {}]:
+        assert validate("rds-storage-type", "aws:rds/instance:Instance", props) == []
+
+
+@pytest.mark.parametrize(
+    "resource_type, props",
+    [
+        ("aws:rds/instance:Instance", {"instanceClass": "db.t4g.micro"}),
+        ("aws:elasticache/cluster:Cluster", {"nodeType": "cache.t3.micro"}),
+    ],
+)
+def test_burstable_instances_depend_on_tier(resource_type, props):
+    assert validate("burstable-instances", resource_type, props) == []
+    assert validate(
+        "burstable-instances", resource_type, props, config={"tier": "prod"}
+    )
+    assert (
+        validate(
+            "burstable-instances",
+            resource_type,
+            props,
+            config=tier_config("staging", "burstable-instances"),
+        )
+        == []
+    )
+
+
+def test_burstable_instances_allow_other_classes():
+    for resource_type, props in [
+        ("aws:rds/instance:Instance", {"instanceClass": "db.m6g.large"}),
+        ("aws:elasticache/cluster:Cluster", {"nodeType": "cache.r7g.large"}),
+    ]:
+        assert (
+            validate(
+                "burstable-instances", resource_type, props, config={"tier": "prod"}
+            )
+            == []
+        )
+
+
+def test_service_desired_count_only_checks_load_balanced_services():
+    load_balanced = {"desiredCount": 1.0, "loadBalancers": [{"containerPort": 3000}]}
+
+    assert validate("service-desired-count", "aws:ecs/service:Service", load_balanced)
+    assert (
+        validate(
+            "service-desired-count", "aws:ecs/service:Service", {"desiredCount": 1.0}
+        )
+        == []
+    )
+    assert (
+        validate(
+            "service-desired-count",
+            "aws:ecs/service:Service",
+            load_balanced,
+            config=tier_config("dev", "service-desired-count"),
+        )
+        == []
+    )
+
+
+def test_non_blocking_logs_flags_blocking_awslogs():
+    definitions = [
+        {
+            "name": "api",
+            "logConfiguration": {
+                "logDriver": "awslogs",
+                "options": {"awslogs-group": "lago"},
+            },
+        },
+        {
+            "name": "worker",
+            "logConfiguration": {
+                "logDriver": "awslogs",
+                "options": {"awslogs-group": "lago", "mode": "non-blocking"},
+            },
+        },
+        {"name": "router", "logConfiguration": {"logDriver": "awsfirelens"}},
+    ]
+
+    violations = validate(
+        "non-blocking-logs",
+        "aws:ecs/taskDefinition:TaskDefinition",
+        {"containerDefinitions": json.dumps(definitions)},
+    )
+
+    assert len(violations) == 1
+    assert "'api'" in violations[0]
+
+
+def test_non_blocking_logs_skips_unknown_definitions():
+    assert (
+        validate("non-blocking-logs", "aws:ecs/taskDefinition:TaskDefinition", {}) == []
+    )
+
+
+def test_deregistration_delay_defaults_to_aws_default():
+    assert validate("deregistration-delay", "aws:lb/targetGroup:TargetGroup", {})
+    assert (
+        validate(
+            "deregistration-delay",
+            "aws:lb/targetGroup:TargetGroup",
+            {"deregistrationDelay": 30.0},
+        )
+        == []
+    )
+
+
+def test_load_balancer_http2_and_container_insights():
+    assert validate(
+        "load-balancer-http2",
+        "aws:lb/loadBalancer:LoadBalancer",
+        {"enableHttp2": False},
+    )
+    assert validate("load-balancer-http2", "aws:lb/loadBalancer:LoadBalancer", {}) == []
+    assert validate("container-insights", "aws:ecs/cluster:Cluster", {})
+    assert (
+        validate(
+            "container-insights",
+            "aws:ecs/cluster:Cluster",
+            {"settings": [{"name": "containerInsights", "value": "enabled"}]},
+        )
+        == []
+    )
+
+
+def test_tier_files_configure_every_policy():
+    names = {policy.name for policy in performance.POLICIES}
+    for tier in performance.TIERS:
+        with open(os.path.join(TIERS_DIR, f"{tier}.json")) as tier_file:
+            config = json.load(tier_file)
+        assert set(config) == names
+        assert all(policy["tier"] == tier for policy in config.values())
+
+    assert tier_config("prod", "rds-storage-type")["enforcementLevel"] == "mandatory"
+    assert tier_config("dev", "rds-storage-type")["enforcementLevel"] == "advisory"
+
+
+PROD_SIZING = {
+    "db_storage_type": "gp3",
+    "db_instance_class": "db.m7g.large",
+    "redis_node_type": "cache.m7g.large",
+    "api_desired_count": "2",
+    "front_desired_count": "2",
+}
+
+
+def prod_violations(program_run):
+    """
+    Names of the resources failing each policy, under the prod tier.
+    """
+    violations = {}
+    for resource in program_run.resources:
+        if not resource.custom:
+            continue
+        # Secret inputs reach the mocks wrapped in their secret envelope
+        props = {
+            key: (
+                value["value"]
+                if isinstance(value, dict) and "value" in value
+                else value
+            )
+            for key, value in resource.inputs.items()
+        }
+        for policy in performance.POLICIES:
+            found = validate(
+                policy.name,
+                resource.typ,
+                props,
+                name=resource.name,
+                config=tier_config("prod", policy.name),
+            )
+            if found:
+                violations.setdefault(policy.name, set()).add(resource.name)
+    return violations
+
+
+def test_program_defaults_in_prod(program):
+    """
+    The program's default sizing trips the prod checks.
+    """
+    assert prod_violations(program()) == {
+        "rds-storage-type": {"lago-db-rds"},
+        "burstable-instances": {"lago-db-rds", "lago-redis"},
+        "service-desired-count": {"lago-front-svc", "lago-be-api-svc"},
+    }
+
+
+def test_program_sized_for_prod(program):
+    assert prod_violations(program(PROD_SIZING)) == {}
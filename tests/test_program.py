@@ -0,0 +1,112 @@
+import collections
+import json
+
+import pulumi
+
+import layers
+
+SERVICES = {"lago-be-api-svc", "lago-be-clock-svc", "lago-front-svc", "lago-pdf-svc"}
+
+
+def test_stack(program):
+    run = program()
+
+    services = {service.name for service in run.of_type("aws:ecs/service:Service")}
+    assert services == SERVICES
+    for task in run.of_type("aws:ecs/taskDefinition:TaskDefinition"):
+        assert task.inputs["requiresCompatibilities"] == ["FARGATE"]
+        assert task.inputs["networkMode"] == "awsvpc"
+
+    names = collections.Counter(
+        (resource.typ, resource.name) for resource in run.resources
+    )
+    assert [name for name, count in names.items() if count > 1] == []
+
+
+def test_backend_is_wired_to_the_data_layer(program):
+    run = program()
+
+    api = run.containers("lago-be-api-task")["lago-be-api-container"]
+    env = {variable["name"]: variable["value"] for variable in api["environment"]}
+    assert env["DATABASE_URL"].startswith("postgres://lago:")
+    assert env["DATABASE_URL"].endswith("@lago-db-rds.rds.amazonaws.com:5432/lago")
+    assert env["REDIS_URL"] == "redis://lago-redis.cache.amazonaws.com:6379"
+    assert env["LAGO_PDF_URL"] == "http://pdf.lago.local:3000"
+
+
+def test_availability_zones_from_config(program):
+    run = program(
+        {"availability_zones": json.dumps(["eu-west-1a", "eu-west-1b", "eu-west-1c"])}
+    )
+
+    assert "aws:index/getAvailabilityZones:getAvailabilityZones" not in {
+        invoke.token for invoke in run.invokes
+    }
+    assert run.named("lago-net-subnet-eu-west-1a")
+
+
+def test_blue_green(program):
+    run = program({"deployment_controller": "CODE_DEPLOY"})
+
+    groups = run.of_type("aws:codedeploy/deploymentGroup:DeploymentGroup")
+    assert len(groups) == 2
+    assert len(run.of_type("aws:codedeploy/application:Application")) == 2
+
+
+def test_layers_return_the_keys_they_export(construct):
+    outputs = {}
+
+    def build():
+        config = pulumi.Config()
+        outputs["network"] = layers.network_layer(config)
+        outputs["data"] = layers.data_layer(config, outputs["network"])
+
+    construct(build)
+
+    assert list(outputs["network"]) == layers.NETWORK_OUTPUTS
+    assert list(outputs["data"]) == layers.DATA_OUTPUTS
+
+
+def test_layers_as_separate_stacks(program):
+    network = program({"layer": "network"})
+    data = program({"layer": "data", "network_stack": "lago/lago-pulumi/network"})
+    app = program(
+        {
+            "layer": "app",
+            "network_stack": "lago/lago-pulumi/network",
+            "data_stack": "lago/lago-pulumi/data",
+        }
+    )
+
+    assert not network.of_type("aws:rds/instance:Instance")
+    assert len(data.of_type("aws:rds/instance:Instance")) == 1
+    assert not data.of_type("aws:ecs/service:Service")
+    assert {
+        service.name for service in app.of_type("aws:ecs/service:Service")
+    } == SERVICES
+    assert not app.of_type("aws:ec2/vpc:Vpc")
+    references = app.of_type("pulumi:pulumi:StackReference")
+    assert {reference.name for reference in references} == {
+        "lago/lago-pulumi/network",
+        "lago/lago-pulumi/data",
+    }
+
+    full = program()
+    assert len(network.resources) + len(data.resources) + len(app.resources) == (
+        len(full.resources) + len(references) + 1
+    )
+
+
+def test_numeric_config_can_be_zero(program):
+    run = program(
+        {
+            "tracing_exporter": "xray",
+            "tracing_sampling_ratio": "0",
+            "alarm_5xx_count": "0",
+        }
+    )
+
+    api = run.containers("lago-be-api-task")["lago-be-api-container"]
+    env = {variable["name"]: variable["value"] for variable in api["environment"]}
+    assert env["OTEL_TRACES_SAMPLER_ARG"] == "0.0"
+    assert run.named("lago-monitoring-api-5xx").inputs["threshold"] == 0
@@ -0,0 +1,109 @@
+import json
+
+from pulumi_aws import config
+
+# AWS Distro for OpenTelemetry collector image used as the tracing sidecar,
+# pinned so task starts are reproducible
+OTEL_COLLECTOR_IMAGE = "public.ecr.aws/aws-observability/aws-otel-collector:v0.40.0"
+
+OTEL_COLLECTOR_CONTAINER_NAME = "otel_collector"
+
+
+class TaskTracing:
+    """
+    OpenTelemetry collector sidecar and SDK settings for one task definition.
+
+    Application containers send OTLP spans to the collector on localhost,
+    which batches them and exports to X-Ray or to an OTLP endpoint.
+    """
+
+    def __init__(
+        self,
+        exporter=None,
+        endpoint=None,
+        sampling_ratio=0.1,
+    ):
+        if exporter not in (None, "xray", "otlp"):
+            raise ValueError(
+                f"Unsupported tracing exporter '{exporter}', expected 'xray' or 'otlp'"
+            )
+        if exporter == "otlp" and endpoint is None:
+            raise ValueError("The 'otlp' tracing exporter requires an endpoint")
+
+        self.exporter = exporter
+        self.endpoint = endpoint
+        self.sampling_ratio = sampling_ratio
+
+    def environment(self, service_name):
+        """
+        OpenTelemetry SDK environment variables for an application container.
+        """
+        if self.exporter is None:
+            return []
+
+        return [
+            {"name": "OTEL_SERVICE_NAME", "value": service_name},
+            {"name": "OTEL_TRACES_EXPORTER", "value": "otlp"},
+            {"name": "OTEL_EXPORTER_OTLP_ENDPOINT", "value": "http://localhost:4318"},
+            {"name": "OTEL_EXPORTER_OTLP_PROTOCOL", "value": "http/protobuf"},
+            {"name": "OTEL_TRACES_SAMPLER", "value": "parentbased_traceidratio"},
+            {"name": "OTEL_TRACES_SAMPLER_ARG", "value": str(self.sampling_ratio)},
+            {"name": "OTEL_PROPAGATORS", "value": "tracecontext,baggage,xray"},
+        ]
+
+    def collector_config(self):
+        """
+        Collector configuration, as JSON (a subset of the YAML it expects).
+        """
+        if self.exporter == "xray":
+            exporters = {"awsxray": {"region": config.region}}
+        else:
+            exporters = {"otlphttp": {"endpoint": self.endpoint}}
+
+        return json.dumps(
+            {
+                "receivers": {
+                    "otlp": {
+                        "protocols": {
+                            "grpc": {"endpoint": "0.0.0.0:4317"},
+                            "http": {"endpoint": "0.0.0.0:4318"},
+                        }
+                    }
+                },
+                "processors": {
+                    "resourcedetection": {"detectors": ["env", "ecs"]},
+                    "batch": {"timeout": "1s", "send_batch_size": 256},
+                },
+                "exporters": exporters,
+                "service": {
+                    "pipelines": {
+                        "traces": {
+                            "receivers": ["otlp"],
+                            "processors": ["resourcedetection", "batch"],
+                            "exporters": list(exporters),
+                        }
+                    }
+                },
+            }
+        )
+
+    def sidecars(self, task_logs):
+        """
+        Extra container definitions required by the tracing configuration.
+        """
+        if self.exporter is None:
+            return []
+
+        return [
+            {
+                "name": OTEL_COLLECTOR_CONTAINER_NAME,
+                "image": OTEL_COLLECTOR_IMAGE,
+                # Losing the collector drops spans, not requests
+                "essential": False,
+                "memoryReservation": 64,
+                "environment": [
+                    {"name": "AOT_CONFIG_CONTENT", "value": self.collector_config()},
+                ],
+                "logConfiguration": task_logs.awslogs("otel"),
+            }
+        ]